@@ -11,15 +11,21 @@ LinkedIn: https://www.linkedin.com/in/hammad-shahid-23a560350/
 
 import os
 import logging
-from flask import Flask, request, jsonify, render_template
-from twilio.twiml import VoiceResponse
+from datetime import datetime
+from flask import Flask, g, request, jsonify, render_template
 from twilio.rest import Client
+from twilio.http.http_client import TwilioHttpClient
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
-from chatbot.llm_handler import LLMHandler
+from chatbot.llm_handler import LLMHandler, StreamInterrupted
 from chatbot.voice_handler import VoiceHandler
 from chatbot.conversation import ConversationManager
 from utils.logger import setup_logger
+from utils.json_provider import ORJSONProvider
+from utils.helpers import REQUEST_TIMESTAMP
+from utils import twiml
 from config.settings import *
 
 # Load environment variables
@@ -31,17 +37,44 @@ logger = setup_logger()
 # Initialize Flask app
 app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'your-secret-key-here')
-
-# Initialize Twilio client
+app.json = ORJSONProvider(app)
+
+# Initialize Twilio client with a pooled keep-alive session so dashboard
+# polls reuse TLS connections instead of handshaking on every request
+twilio_http_client = TwilioHttpClient(timeout=TWILIO_SETTINGS['http_timeout'])
+twilio_http_client.session.mount('https://', HTTPAdapter(
+    pool_connections=TWILIO_SETTINGS['http_pool_size'],
+    pool_maxsize=TWILIO_SETTINGS['http_pool_size'],
+    max_retries=Retry(total=TWILIO_SETTINGS['retry_attempts'], backoff_factor=0.2)
+))
 twilio_client = Client(
     os.getenv('TWILIO_ACCOUNT_SID'),
-    os.getenv('TWILIO_AUTH_TOKEN')
+    os.getenv('TWILIO_AUTH_TOKEN'),
+    http_client=twilio_http_client
 )
 
+# Share conversations between workers through Redis when configured
+conversation_store = None
+if os.getenv('REDIS_URL'):
+    from chatbot.redis_store import RedisConversationStore
+    conversation_store = RedisConversationStore.from_url(os.getenv('REDIS_URL'))
+
 # Initialize chatbot components
 llm_handler = LLMHandler()
 voice_handler = VoiceHandler()
-conversation_manager = ConversationManager()
+conversation_manager = ConversationManager(store=conversation_store)
+
+@app.before_request
+def stamp_request():
+    """Read the clock once for the timestamps logged while handling this request"""
+    g.request_timestamp_token = REQUEST_TIMESTAMP.set(datetime.now().isoformat())
+
+@app.teardown_request
+def clear_request_stamp(error=None):
+    """Reset the request timestamp so it doesn't leak into the worker's next task"""
+    token = g.pop('request_timestamp_token', None)
+    if token is not None:
+        REQUEST_TIMESTAMP.reset(token)
 
 @app.route('/')
 def index():
@@ -66,83 +99,66 @@ def webhook():
         speech_result = request.form.get('SpeechResult', '')
         confidence = request.form.get('Confidence', 0)
         
-        logger.info(f"Received call from {from_number} to {to_number}")
-        logger.info(f"Speech result: {speech_result} (confidence: {confidence})")
+        logger.info("Received call from %s to %s", from_number, to_number)
+        logger.info("Speech result: %s (confidence: %s)", speech_result, confidence)
         
         # Initialize or get conversation
         conversation = conversation_manager.get_conversation(call_sid)
         
-        # Create TwiML response
-        response = VoiceResponse()
+        # TwiML is assembled from pre-rendered fragments; only spoken text is rendered per request
+        fragments = []
         
         # Handle first-time call
         if not conversation.is_started():
             # Welcome message
             welcome_message = f"Hello! I'm {BOT_PERSONALITY['name']}, your AI assistant. How can I help you today?"
-            response.say(welcome_message, voice=VOICE_SETTINGS['voice'])
+            fragments.append(twiml.say(welcome_message))
             conversation.start()
             
             # Set up speech recognition
-            gather = response.gather(
-                input='speech',
-                timeout=10,
-                speech_timeout='auto',
-                language=VOICE_SETTINGS['language'],
-                action='/webhook',
-                method='POST'
-            )
-            gather.say("I'm listening...", voice=VOICE_SETTINGS['voice'])
+            fragments.append(twiml.LISTENING_GATHER)
             
         else:
             # Process user input
             if speech_result:
-                # Get AI response
-                ai_response = llm_handler.generate_response(
-                    user_input=speech_result,
-                    conversation_history=conversation.get_history()
-                )
+                # Stream the AI response, one <Say> per sentence so Twilio can
+                # start speaking the first sentence while the rest is synthesized
+                ai_sentences = []
+                try:
+                    for sentence in llm_handler.stream_response(
+                        user_input=speech_result,
+                        conversation_history=conversation.get_history()
+                    ):
+                        fragments.append(twiml.say(sentence))
+                        ai_sentences.append(sentence)
+                except StreamInterrupted as e:
+                    # Speak the fallback, but keep it out of the history
+                    fragments.append(twiml.say(e.fallback))
                 
                 # Add to conversation history
                 conversation.add_message('user', speech_result)
-                conversation.add_message('assistant', ai_response)
-                
-                # Convert to speech and respond
-                response.say(ai_response, voice=VOICE_SETTINGS['voice'])
+                if ai_sentences:
+                    conversation.add_message('assistant', " ".join(ai_sentences))
                 
                 # Continue listening
-                gather = response.gather(
-                    input='speech',
-                    timeout=10,
-                    speech_timeout='auto',
-                    language=VOICE_SETTINGS['language'],
-                    action='/webhook',
-                    method='POST'
-                )
-                gather.say("What else can I help you with?", voice=VOICE_SETTINGS['voice'])
+                fragments.append(twiml.CONTINUE_GATHER)
                 
             else:
                 # No speech detected
-                response.say("I didn't catch that. Could you please repeat?", voice=VOICE_SETTINGS['voice'])
-                gather = response.gather(
-                    input='speech',
-                    timeout=10,
-                    speech_timeout='auto',
-                    language=VOICE_SETTINGS['language'],
-                    action='/webhook',
-                    method='POST'
-                )
+                fragments.append(twiml.REPEAT_SAY)
+                fragments.append(twiml.REPEAT_GATHER)
+        
+        # Persist this turn's changes
+        conversation_manager.save_conversation(conversation)
         
         # Handle hangup
-        response.say("Thank you for calling. Have a great day!", voice=VOICE_SETTINGS['voice'])
+        fragments.append(twiml.FAREWELL_SAY)
         
-        return str(response)
+        return twiml.build_response(fragments)
         
     except Exception as e:
-        logger.error(f"Error in webhook: {str(e)}")
-        response = VoiceResponse()
-        response.say("I'm sorry, I'm experiencing technical difficulties. Please try again later.", 
-                    voice=VOICE_SETTINGS['voice'])
-        return str(response)
+        logger.error("Error in webhook: %s", e)
+        return twiml.ERROR_RESPONSE
 
 @app.route('/api/status')
 def api_status():
@@ -170,7 +186,7 @@ def api_calls():
             })
         return jsonify(call_data)
     except Exception as e:
-        logger.error(f"Error fetching calls: {str(e)}")
+        logger.error("Error fetching calls: %s", e)
         return jsonify({'error': 'Failed to fetch calls'}), 500
 
 @app.route('/api/conversations')
@@ -180,7 +196,7 @@ def api_conversations():
         conversations = conversation_manager.get_all_conversations()
         return jsonify(conversations)
     except Exception as e:
-        logger.error(f"Error fetching conversations: {str(e)}")
+        logger.error("Error fetching conversations: %s", e)
         return jsonify({'error': 'Failed to fetch conversations'}), 500
 
 @app.errorhandler(404)
@@ -189,7 +205,7 @@ def not_found(error):
 
 @app.errorhandler(500)
 def internal_error(error):
-    logger.error(f"Internal server error: {str(error)}")
+    logger.error("Internal server error: %s", error)
     return jsonify({'error': 'Internal server error'}), 500
 
 if __name__ == '__main__':
@@ -198,13 +214,13 @@ if __name__ == '__main__':
     missing_vars = [var for var in required_vars if not os.getenv(var)]
     
     if missing_vars:
-        logger.error(f"Missing required environment variables: {missing_vars}")
+        logger.error("Missing required environment variables: %s", missing_vars)
         logger.error("Please set these variables in your .env file")
         exit(1)
     
     logger.info("Starting LLM Twilio Callbot...")
-    logger.info(f"Bot personality: {BOT_PERSONALITY['name']}")
-    logger.info(f"Voice settings: {VOICE_SETTINGS['voice']}")
+    logger.info("Bot personality: %s", BOT_PERSONALITY['name'])
+    logger.info("Voice settings: %s", VOICE_SETTINGS['voice'])
     
     # Run the application
     app.run(
@@ -3,11 +3,15 @@ Conversation Manager - Conversation State Management
 Handles conversation state, history, and context management
 """
 
+import heapq
 import logging
+import threading
 import time
-from typing import Dict, List, Any, Optional
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, List, Any, MutableMapping, Optional, Tuple
 from datetime import datetime, timedelta
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field, asdict
 
 logger = logging.getLogger(__name__)
 
@@ -18,12 +22,16 @@ class Message:
     content: str
     timestamp: datetime
     metadata: Dict[str, Any] = None
+    content_lower: str = field(init=False, repr=False, compare=False)  # Precomputed for search
+    timestamp_iso: str = field(init=False, repr=False, compare=False)  # Precomputed for serialization
     
     def __post_init__(self):
         if self.metadata is None:
             self.metadata = {}
         if self.timestamp is None:
             self.timestamp = datetime.now()
+        self.content_lower = self.content.lower()
+        self.timestamp_iso = self.timestamp.isoformat()
 
 @dataclass
 class Conversation:
@@ -35,6 +43,9 @@ class Conversation:
     messages: List[Message]
     is_active: bool
     metadata: Dict[str, Any] = None
+    user_count: int = 0
+    assistant_count: int = 0
+    start_monotonic: float = field(default=None, repr=False, compare=False)  # Process-local clock for durations
     
     def __post_init__(self):
         if self.messages is None:
@@ -43,24 +54,98 @@ class Conversation:
             self.metadata = {}
         if self.start_time is None:
             self.start_time = datetime.now()
+        if self.start_monotonic is None:
+            # Conversations loaded from a shared store started in another process
+            self.start_monotonic = time.monotonic() - (datetime.now() - self.start_time).total_seconds()
+    
+    def duration_seconds(self) -> float:
+        """Seconds elapsed since the conversation started"""
+        return time.monotonic() - self.start_monotonic
+    
+    def is_started(self) -> bool:
+        """Check if the welcome message has been played"""
+        return self.metadata.get('started', False)
+    
+    def start(self):
+        """Mark the conversation as started"""
+        self.metadata['started'] = True
+    
+    def add_message(self, role: str, content: str, metadata: Dict[str, Any] = None) -> Message:
+        """
+        Append a message to the conversation
+        
+        Messages are only ever appended, so the history sent to the LLM keeps
+        a stable prefix from turn to turn.
+        
+        Args:
+            role (str): Message role ('user' or 'assistant')
+            content (str): Message content
+            metadata (Dict): Additional message metadata
+            
+        Returns:
+            Message: The added message
+        """
+        now = datetime.now()
+        message = Message(
+            role=role,
+            content=content,
+            timestamp=now,
+            metadata=metadata or {}
+        )
+        
+        self.messages.append(message)
+        if role == 'user':
+            self.user_count += 1
+        elif role == 'assistant':
+            self.assistant_count += 1
+        
+        # Update conversation metadata
+        self.metadata['last_activity'] = now.isoformat()
+        self.metadata['message_count'] = len(self.messages)
+        
+        return message
+    
+    def get_history(self) -> List[Dict[str, str]]:
+        """
+        Get the conversation history in LLM message format
+        
+        Returns:
+            List[Dict]: Messages with role and content, oldest first
+        """
+        return [{'role': message.role, 'content': message.content} for message in self.messages]
 
 class ConversationManager:
     """Manages conversation state and history"""
     
-    def __init__(self, max_conversations: int = 1000, cleanup_interval: int = 3600):
+    def __init__(self, max_conversations: int = 1000, cleanup_interval: int = 3600,
+                 store: MutableMapping[str, Conversation] = None):
         """
         Initialize the conversation manager
         
         Args:
             max_conversations (int): Maximum number of conversations to keep in memory
             cleanup_interval (int): Interval in seconds to clean up old conversations
+            store (MutableMapping): Shared conversation store (e.g. Redis); in-memory if None
         """
-        self.conversations: Dict[str, Conversation] = {}
+        # Insertion order is creation order, so the newest conversations are at the end
+        self.conversations: MutableMapping[str, Conversation] = store if store is not None else OrderedDict()
+        self.persistent = store is not None
         self.max_conversations = max_conversations
         self.cleanup_interval = cleanup_interval
-        self.last_cleanup = time.time()
         
-        logger.info(f"Conversation Manager initialized with max {max_conversations} conversations")
+        # Ended conversations: a min-heap by start time for age-based expiry and
+        # an end-ordered dict for size-based eviction. Entries are removed lazily.
+        self._expiry_heap: List[Tuple[datetime, str]] = []
+        self._inactive: Dict[str, None] = OrderedDict()
+        
+        # Cleanup runs on a background timer instead of on the request path;
+        # the lock keeps it from racing conversation creation and listing
+        self._lock = threading.RLock()
+        self._cleanup_timer: Optional[threading.Timer] = None
+        if not self.persistent and cleanup_interval > 0:
+            self._schedule_cleanup()
+        
+        logger.info("Conversation Manager initialized with max %s conversations", max_conversations)
     
     def get_conversation(self, call_sid: str, from_number: str = None, to_number: str = None) -> Conversation:
         """
@@ -74,23 +159,26 @@ class ConversationManager:
         Returns:
             Conversation: The conversation object
         """
-        # Clean up old conversations if needed
-        self._cleanup_old_conversations()
+        # Single lookup on the common path of an existing call
+        conversation = self.conversations.get(call_sid)
+        if conversation is not None:
+            return conversation
         
-        if call_sid not in self.conversations:
-            # Create new conversation
-            conversation = Conversation(
-                call_sid=call_sid,
-                from_number=from_number or "unknown",
-                to_number=to_number or "unknown",
-                start_time=datetime.now(),
-                messages=[],
-                is_active=True
-            )
-            self.conversations[call_sid] = conversation
-            logger.info(f"Created new conversation for call {call_sid}")
-        else:
-            conversation = self.conversations[call_sid]
+        with self._lock:
+            conversation = self.conversations.get(call_sid)
+            if conversation is None:
+                # Create new conversation
+                conversation = Conversation(
+                    call_sid=call_sid,
+                    from_number=from_number or "unknown",
+                    to_number=to_number or "unknown",
+                    start_time=datetime.now(),
+                    messages=[],
+                    is_active=True,
+                    start_monotonic=time.monotonic()
+                )
+                self.conversations[call_sid] = conversation
+                logger.info("Created new conversation for call %s", call_sid)
         
         return conversation
     
@@ -109,27 +197,29 @@ class ConversationManager:
         """
         try:
             conversation = self.get_conversation(call_sid)
+            conversation.add_message(role, content, metadata)
+            self.save_conversation(conversation)
             
-            message = Message(
-                role=role,
-                content=content,
-                timestamp=datetime.now(),
-                metadata=metadata or {}
-            )
-            
-            conversation.messages.append(message)
-            
-            # Update conversation metadata
-            conversation.metadata['last_activity'] = datetime.now().isoformat()
-            conversation.metadata['message_count'] = len(conversation.messages)
-            
-            logger.debug(f"Added {role} message to conversation {call_sid}")
+            logger.debug("Added %s message to conversation %s", role, call_sid)
             return True
             
         except Exception as e:
-            logger.error(f"Error adding message to conversation {call_sid}: {str(e)}")
+            logger.error("Error adding message to conversation %s: %s", call_sid, e)
             return False
     
+    def save_conversation(self, conversation: Conversation):
+        """
+        Write a modified conversation back to the store
+        
+        In-memory conversations are shared objects, so this only matters
+        when a persistent store is configured.
+        
+        Args:
+            conversation (Conversation): The conversation to save
+        """
+        if self.persistent:
+            self.conversations[conversation.call_sid] = conversation
+    
     def get_history(self, call_sid: str, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Get conversation history for a call
@@ -153,14 +243,14 @@ class ConversationManager:
                 history.append({
                     'role': message.role,
                     'content': message.content,
-                    'timestamp': message.timestamp.isoformat(),
+                    'timestamp': message.timestamp_iso,
                     'metadata': message.metadata
                 })
             
             return history
             
         except Exception as e:
-            logger.error(f"Error getting history for conversation {call_sid}: {str(e)}")
+            logger.error("Error getting history for conversation %s: %s", call_sid, e)
             return []
     
     def end_conversation(self, call_sid: str) -> bool:
@@ -174,22 +264,29 @@ class ConversationManager:
             bool: True if conversation was ended successfully
         """
         try:
-            if call_sid in self.conversations:
-                conversation = self.conversations[call_sid]
-                conversation.is_active = False
-                conversation.metadata['end_time'] = datetime.now().isoformat()
-                conversation.metadata['duration'] = (
-                    datetime.now() - conversation.start_time
-                ).total_seconds()
+            conversation = self.conversations.get(call_sid)
+            if conversation is not None:
+                with self._lock:
+                    # Mark ended before queueing, so a cleanup pass never sees
+                    # a queued entry for a conversation that is still active
+                    conversation.is_active = False
+                    conversation.metadata['end_time'] = datetime.now().isoformat()
+                    conversation.metadata['duration'] = conversation.duration_seconds()
+                    
+                    # Persistent stores expire conversations themselves
+                    if not self.persistent and call_sid not in self._inactive:
+                        heapq.heappush(self._expiry_heap, (conversation.start_time, call_sid))
+                        self._inactive[call_sid] = None
+                self.save_conversation(conversation)
                 
-                logger.info(f"Ended conversation {call_sid}")
+                logger.info("Ended conversation %s", call_sid)
                 return True
             else:
-                logger.warning(f"Conversation {call_sid} not found for ending")
+                logger.warning("Conversation %s not found for ending", call_sid)
                 return False
                 
         except Exception as e:
-            logger.error(f"Error ending conversation {call_sid}: {str(e)}")
+            logger.error("Error ending conversation %s: %s", call_sid, e)
             return False
     
     def get_conversation_stats(self, call_sid: str) -> Dict[str, Any]:
@@ -204,29 +301,27 @@ class ConversationManager:
         """
         try:
             conversation = self.get_conversation(call_sid)
-            
-            user_messages = [msg for msg in conversation.messages if msg.role == 'user']
-            assistant_messages = [msg for msg in conversation.messages if msg.role == 'assistant']
-            
-            stats = {
-                'call_sid': call_sid,
-                'from_number': conversation.from_number,
-                'to_number': conversation.to_number,
-                'start_time': conversation.start_time.isoformat(),
-                'is_active': conversation.is_active,
-                'total_messages': len(conversation.messages),
-                'user_messages': len(user_messages),
-                'assistant_messages': len(assistant_messages),
-                'duration_seconds': (datetime.now() - conversation.start_time).total_seconds(),
-                'metadata': conversation.metadata
-            }
-            
-            return stats
+            return self._conversation_stats(conversation)
             
         except Exception as e:
-            logger.error(f"Error getting stats for conversation {call_sid}: {str(e)}")
+            logger.error("Error getting stats for conversation %s: %s", call_sid, e)
             return {}
     
+    def _conversation_stats(self, conversation: Conversation) -> Dict[str, Any]:
+        """Build the statistics dict for an already loaded conversation"""
+        return {
+            'call_sid': conversation.call_sid,
+            'from_number': conversation.from_number,
+            'to_number': conversation.to_number,
+            'start_time': conversation.start_time.isoformat(),
+            'is_active': conversation.is_active,
+            'total_messages': len(conversation.messages),
+            'user_messages': conversation.user_count,
+            'assistant_messages': conversation.assistant_count,
+            'duration_seconds': conversation.duration_seconds(),
+            'metadata': conversation.metadata
+        }
+    
     def get_all_conversations(self, limit: int = 50) -> List[Dict[str, Any]]:
         """
         Get all conversations (for admin dashboard)
@@ -238,23 +333,22 @@ class ConversationManager:
             List[Dict]: List of conversation summaries
         """
         try:
-            conversations = []
-            
-            # Sort by start time (newest first)
-            sorted_conversations = sorted(
-                self.conversations.values(),
-                key=lambda c: c.start_time,
-                reverse=True
-            )
-            
-            for conversation in sorted_conversations[:limit]:
-                stats = self.get_conversation_stats(conversation.call_sid)
-                conversations.append(stats)
-            
-            return conversations
+            # The iterator is created and consumed under the lock so a cleanup
+            # pass can't change the dict while it is being read
+            with self._lock:
+                if self.persistent:
+                    # Shared stores have no ordering, so sort by start time
+                    newest_first = sorted(self.conversations.values(), key=lambda c: c.start_time, reverse=True)
+                else:
+                    # Newest first, read from the end of the insertion-ordered dict
+                    newest_first = reversed(self.conversations.values())
+                
+                # Stats are built from the conversations already in hand rather than
+                # looked up again by call SID for every row
+                return [self._conversation_stats(conversation) for conversation in islice(newest_first, limit)]
             
         except Exception as e:
-            logger.error(f"Error getting all conversations: {str(e)}")
+            logger.error("Error getting all conversations: %s", e)
             return []
     
     def search_conversations(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
@@ -272,11 +366,14 @@ class ConversationManager:
             results = []
             query_lower = query.lower()
             
-            for conversation in self.conversations.values():
+            with self._lock:
+                conversations = list(self.conversations.values())
+            
+            for conversation in conversations:
                 # Search in message content
                 for message in conversation.messages:
-                    if query_lower in message.content.lower():
-                        stats = self.get_conversation_stats(conversation.call_sid)
+                    if query_lower in message.content_lower:
+                        stats = self._conversation_stats(conversation)
                         stats['matching_message'] = message.content
                         results.append(stats)
                         break
@@ -287,51 +384,59 @@ class ConversationManager:
             return results
             
         except Exception as e:
-            logger.error(f"Error searching conversations: {str(e)}")
+            logger.error("Error searching conversations: %s", e)
             return []
     
+    def _schedule_cleanup(self):
+        """Arm the background timer for the next cleanup pass"""
+        self._cleanup_timer = threading.Timer(self.cleanup_interval, self._run_cleanup)
+        self._cleanup_timer.daemon = True
+        self._cleanup_timer.start()
+    
+    def _run_cleanup(self):
+        """Timer callback: clean up, then schedule the next pass"""
+        self._cleanup_old_conversations()
+        self._schedule_cleanup()
+    
+    def stop_cleanup(self):
+        """Cancel the background cleanup timer"""
+        if self._cleanup_timer is not None:
+            self._cleanup_timer.cancel()
+            self._cleanup_timer = None
+    
     def _cleanup_old_conversations(self):
         """Clean up old conversations to prevent memory issues"""
-        current_time = time.time()
-        
-        # Only cleanup if enough time has passed
-        if current_time - self.last_cleanup < self.cleanup_interval:
+        # Persistent stores expire conversations themselves
+        if self.persistent:
             return
         
         try:
-            # Remove conversations older than 24 hours
-            cutoff_time = datetime.now() - timedelta(hours=24)
-            old_conversations = []
-            
-            for call_sid, conversation in self.conversations.items():
-                if conversation.start_time < cutoff_time and not conversation.is_active:
-                    old_conversations.append(call_sid)
-            
-            # Remove old conversations
-            for call_sid in old_conversations:
-                del self.conversations[call_sid]
-            
-            # If still too many conversations, remove oldest inactive ones
-            if len(self.conversations) > self.max_conversations:
-                sorted_conversations = sorted(
-                    self.conversations.items(),
-                    key=lambda x: x[1].start_time
-                )
+            with self._lock:
+                # Remove ended conversations older than 24 hours
+                cutoff_time = datetime.now() - timedelta(hours=24)
+                removed = 0
                 
-                # Keep active conversations and remove oldest inactive ones
-                active_conversations = {k: v for k, v in self.conversations.items() if v.is_active}
-                inactive_conversations = {k: v for k, v in self.conversations.items() if not v.is_active}
+                while self._expiry_heap and self._expiry_heap[0][0] < cutoff_time:
+                    start_time, call_sid = heapq.heappop(self._expiry_heap)
+                    conversation = self.conversations.get(call_sid)
+                    
+                    # Skip entries for conversations already evicted or replaced
+                    if conversation is not None and not conversation.is_active and conversation.start_time == start_time:
+                        del self.conversations[call_sid]
+                        self._inactive.pop(call_sid, None)
+                        removed += 1
                 
-                # Remove oldest inactive conversations
-                for call_sid, _ in sorted_conversations:
-                    if call_sid in inactive_conversations and len(self.conversations) > self.max_conversations:
+                # If still too many conversations, remove the earliest ended ones
+                while len(self.conversations) > self.max_conversations and self._inactive:
+                    call_sid, _ = self._inactive.popitem(last=False)
+                    conversation = self.conversations.get(call_sid)
+                    if conversation is not None and not conversation.is_active:
                         del self.conversations[call_sid]
-            
-            self.last_cleanup = current_time
-            logger.info(f"Cleaned up {len(old_conversations)} old conversations")
-            
+                
+                logger.info("Cleaned up %s old conversations", removed)
+                
         except Exception as e:
-            logger.error(f"Error during conversation cleanup: {str(e)}")
+            logger.error("Error during conversation cleanup: %s", e)
     
     def export_conversation(self, call_sid: str) -> Dict[str, Any]:
         """
@@ -360,12 +465,12 @@ class ConversationManager:
                 export_data['messages'].append({
                     'role': message.role,
                     'content': message.content,
-                    'timestamp': message.timestamp.isoformat(),
+                    'timestamp': message.timestamp_iso,
                     'metadata': message.metadata
                 })
             
             return export_data
             
         except Exception as e:
-            logger.error(f"Error exporting conversation {call_sid}: {str(e)}")
+            logger.error("Error exporting conversation %s: %s", call_sid, e)
             return {} 
\ No newline at end of file
@@ -0,0 +1,259 @@
+"""
+LLM Cache - Response Caching
+Caches generated responses so repeated prompts skip the OpenAI round-trip
+"""
+
+import json
+import time
+import hashlib
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Protocol, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+class CacheBackend(Protocol):
+    """Storage interface used by LLMCache"""
+
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        ...
+
+class MemoryBackend:
+    """In-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_size: int = 10000):
+        """
+        Initialize the memory backend
+
+        Args:
+            max_size (int): Maximum number of entries to keep
+        """
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+
+            # Evict least recently used entries
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class RedisBackend:
+    """Redis-backed cache shared between workers"""
+
+    def __init__(self, client, prefix: str = "llm:"):
+        """
+        Initialize the Redis backend
+
+        Args:
+            client: A connected redis.Redis client
+            prefix (str): Key prefix for cache entries
+        """
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(self.prefix + key)
+        if isinstance(value, bytes):
+            return value.decode('utf-8')
+        return value
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+class LLMCache:
+    """Exact-match cache for LLM responses"""
+
+    def __init__(self, backend: CacheBackend, ttl: int = 3600, enabled: bool = True):
+        """
+        Initialize the LLM cache
+
+        Args:
+            backend (CacheBackend): Storage backend
+            ttl (int): Time to live for cached responses in seconds
+            enabled (bool): Whether the cache is used at all
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        """
+        Build a deterministic cache key for a completion request
+
+        Args:
+            model (str): Model name
+            messages (List[Dict]): Messages sent to the model
+            temperature (float): Sampling temperature
+            max_tokens (int): Maximum tokens to generate
+
+        Returns:
+            str: Hex digest identifying the request
+        """
+        payload = json.dumps(
+            {'m': model, 'msgs': messages, 't': temperature, 'mx': max_tokens},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, if any"""
+        if not self.enabled:
+            return None
+
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.warning("LLM cache lookup failed: %s", e)
+            return None
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        """Store a response under a key"""
+        if not self.enabled:
+            return
+
+        try:
+            self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            logger.warning("LLM cache write failed: %s", e)
+
+class SemanticCache:
+    """Nearest-neighbour cache that matches paraphrased user inputs"""
+
+    def __init__(self, embed_fn: Callable[[str], Sequence[float]], threshold: float = 0.92,
+                 max_size: int = 1000, enabled: bool = True):
+        """
+        Initialize the semantic cache
+
+        Args:
+            embed_fn (Callable): Function returning an embedding vector for a text
+            threshold (float): Minimum cosine similarity for a hit
+            max_size (int): Maximum number of cached responses
+            enabled (bool): Whether the cache is used at all
+        """
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_size = max_size
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+        self._vectors: Optional[np.ndarray] = None
+        self._responses: List[str] = []
+        self._last_used = np.zeros(max_size, dtype=np.int64)
+        self._clock = 0
+        self._lock = threading.Lock()
+
+    def embed(self, text: str) -> Optional[np.ndarray]:
+        """
+        Embed a text as an L2-normalized float32 vector
+
+        Args:
+            text (str): Text to embed
+
+        Returns:
+            Optional[np.ndarray]: Normalized vector, or None if embedding failed
+        """
+        try:
+            vector = np.asarray(self.embed_fn(text), dtype=np.float32)
+        except Exception as e:
+            logger.warning("Semantic cache embedding failed: %s", e)
+            return None
+
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return vector / norm
+
+    def lookup(self, vector: np.ndarray) -> Optional[str]:
+        """
+        Find the cached response closest to a vector
+
+        Args:
+            vector (np.ndarray): Normalized query vector
+
+        Returns:
+            Optional[str]: Cached response if similarity exceeds the threshold
+        """
+        if not self.enabled or vector is None:
+            return None
+
+        with self._lock:
+            if not self._responses:
+                self.misses += 1
+                return None
+
+            # Vectors are normalized, so the inner product is the cosine similarity
+            scores = self._vectors[:len(self._responses)] @ vector
+            index = int(np.argmax(scores))
+            if scores[index] < self.threshold:
+                self.misses += 1
+                return None
+
+            self._clock += 1
+            self._last_used[index] = self._clock
+            self.hits += 1
+            return self._responses[index]
+
+    def add(self, vector: np.ndarray, response: str) -> None:
+        """
+        Cache a response under a vector, evicting the least recently used entry when full
+
+        Args:
+            vector (np.ndarray): Normalized vector of the user input
+            response (str): Generated response
+        """
+        if not self.enabled or vector is None:
+            return
+
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+
+            if len(self._responses) < self.max_size:
+                index = len(self._responses)
+                self._responses.append(response)
+            else:
+                index = int(np.argmin(self._last_used))
+                self._responses[index] = response
+
+            self._vectors[index] = vector
+            self._clock += 1
+            self._last_used[index] = self._clock
+
+    def __len__(self) -> int:
+        return len(self._responses)
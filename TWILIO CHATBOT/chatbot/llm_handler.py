@@ -4,13 +4,32 @@ Handles communication with OpenAI's GPT models
 """
 
 import os
+import re
 import logging
 import openai
-from typing import List, Dict, Any
+import orjson
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from config.settings import BOT_PERSONALITY, LLM_SETTINGS
+from chatbot.llm_cache import LLMCache, MemoryBackend, SemanticCache
+from chatbot.rate_limiter import RateLimitExceeded, TokenBucket, acquire_all
 
 logger = logging.getLogger(__name__)
 
+# Sentence boundary used to split streamed responses: end punctuation and
+# whitespace before a capital letter, except after an initial or a common
+# abbreviation ("Dr. Smith", "e.g. Paris"), where a split would add a pause
+SENTENCE_END_RE = re.compile(
+    r'(?<!\b[A-Z])(?<!\b(?:Dr|Mr|Ms|Jr|Sr|St|vs))(?<!\bMrs)(?<!\bi\.e)(?<!\be\.g)'
+    r'[.!?]\s+(?=[A-Z])'
+)
+
+class StreamInterrupted(Exception):
+    """Raised when a streamed response fails; carries the spoken fallback for the caller"""
+
+    def __init__(self, fallback: str):
+        super().__init__(fallback)
+        self.fallback = fallback
+
 class LLMHandler:
     """Handles interactions with OpenAI's language models"""
     
@@ -24,8 +43,36 @@ class LLMHandler:
         self.model = LLM_SETTINGS.get('model', 'gpt-3.5-turbo')
         self.max_tokens = LLM_SETTINGS.get('max_tokens', 150)
         self.temperature = LLM_SETTINGS.get('temperature', 0.7)
+        self.max_history = LLM_SETTINGS.get('max_history', 50)
+        
+        # The personality is fixed for the process, so build the system prompt once
+        self.system_message = self._create_system_message()
+        
+        # Exact-match response cache
+        self.cache = LLMCache(
+            MemoryBackend(max_size=LLM_SETTINGS.get('cache_max_size', 10000)),
+            ttl=LLM_SETTINGS.get('cache_ttl', 3600),
+            enabled=os.getenv('LLM_CACHE', '1') == '1'
+        )
+        
+        # Paraphrase-tolerant cache for short, context-free turns
+        self.embedding_model = LLM_SETTINGS.get('embedding_model', 'text-embedding-3-small')
+        self.semantic_cache_max_history = LLM_SETTINGS.get('semantic_cache_max_history', 0)
+        self.semantic_cache = SemanticCache(
+            self._embed,
+            threshold=LLM_SETTINGS.get('semantic_cache_threshold', 0.92),
+            max_size=LLM_SETTINGS.get('semantic_cache_max_size', 1000),
+            enabled=os.getenv('LLM_SEMANTIC_CACHE', '0') == '1'
+        )
+        
+        # Request/token budgets so concurrent calls queue locally instead of hitting 429s.
+        # Buckets are per process, so each worker gets its share of the account limits.
+        workers = max(LLM_SETTINGS.get('worker_processes', 1), 1)
+        self.request_limiter = TokenBucket(LLM_SETTINGS.get('requests_per_minute', 3500) / workers)
+        self.token_limiter = TokenBucket(LLM_SETTINGS.get('tokens_per_minute', 90000) / workers)
+        self.rate_limit_wait = LLM_SETTINGS.get('rate_limit_wait', 5.0)
         
-        logger.info(f"LLM Handler initialized with model: {self.model}")
+        logger.info("LLM Handler initialized with model: %s", self.model)
     
     def generate_response(self, user_input: str, conversation_history: List[Dict[str, str]] = None) -> str:
         """
@@ -42,38 +89,196 @@ class LLMHandler:
             # Build the conversation context
             messages = self._build_messages(user_input, conversation_history)
             
+            cached_response, cache_key, query_vector = self._lookup_cache(user_input, conversation_history, messages)
+            if cached_response is not None:
+                return cached_response
+            
             # Make API call to OpenAI
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                top_p=1.0,
-                frequency_penalty=0.0,
-                presence_penalty=0.0
-            )
+            response = self._chat_completion(messages)
             
             # Extract the response
             ai_response = response.choices[0].message.content.strip()
+            self._store_cache(cache_key, query_vector, ai_response)
             
-            logger.info(f"Generated response: {ai_response[:100]}...")
+            logger.info("Generated response: %s...", ai_response[:100])
             return ai_response
             
-        except openai.error.RateLimitError:
+        except Exception as e:
+            return self._error_response(e)
+    
+    def stream_response(self, user_input: str, conversation_history: List[Dict[str, str]] = None) -> Iterator[str]:
+        """
+        Generate a response and yield it sentence by sentence as tokens arrive
+        
+        Args:
+            user_input (str): The user's input text
+            conversation_history (List[Dict]): Previous conversation messages
+            
+        Yields:
+            str: Complete sentences of the AI response
+            
+        Raises:
+            StreamInterrupted: If generation fails; sentences already yielded are
+                a partial reply and the exception carries the fallback to speak
+        """
+        try:
+            messages = self._build_messages(user_input, conversation_history)
+            
+            cached_response, cache_key, query_vector = self._lookup_cache(user_input, conversation_history, messages)
+            if cached_response is not None:
+                yield cached_response
+                return
+            
+            response = self._chat_completion(messages, stream=True)
+            
+            sentences = []
+            buffer = ""
+            for chunk in response:
+                buffer += chunk.choices[0].delta.get('content') or ""
+                
+                # Emit every complete sentence in the buffer
+                match = SENTENCE_END_RE.search(buffer)
+                while match:
+                    sentence = buffer[:match.end()].strip()
+                    buffer = buffer[match.end():]
+                    if sentence:
+                        sentences.append(sentence)
+                        yield sentence
+                    match = SENTENCE_END_RE.search(buffer)
+            
+            # Flush the trailing sentence
+            if buffer.strip():
+                sentences.append(buffer.strip())
+                yield buffer.strip()
+            
+            ai_response = " ".join(sentences)
+            self._store_cache(cache_key, query_vector, ai_response)
+            
+            logger.info("Streamed response: %s...", ai_response[:100])
+            
+        except Exception as e:
+            # Raised rather than yielded so the fallback isn't mistaken for
+            # part of the reply and saved into the conversation history
+            raise StreamInterrupted(self._error_response(e)) from e
+    
+    def _chat_completion(self, messages: List[Dict[str, str]], stream: bool = False):
+        """
+        Call the chat completion API with the handler's generation settings
+        
+        Args:
+            messages (List[Dict]): Messages to send
+            stream (bool): Whether to stream the response
+            
+        Returns:
+            The completion, or an iterator of chunks when streaming
+        """
+        self._acquire_capacity(messages, self.max_tokens)
+        return openai.ChatCompletion.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            top_p=1.0,
+            frequency_penalty=0.0,
+            presence_penalty=0.0,
+            stream=stream
+        )
+    
+    def _lookup_cache(self, user_input: str, conversation_history: List[Dict[str, str]],
+                      messages: List[Dict[str, str]]) -> Tuple[Optional[str], str, Any]:
+        """
+        Look up a cached response for a request
+        
+        Args:
+            user_input (str): The user's input text
+            conversation_history (List[Dict]): Previous conversation messages
+            messages (List[Dict]): Messages that would be sent to OpenAI
+            
+        Returns:
+            Tuple: Cached response (or None), exact cache key, and semantic query vector
+        """
+        # Return a cached response for an identical request
+        cache_key = LLMCache.make_key(self.model, messages, self.temperature, self.max_tokens)
+        cached_response = self.cache.get(cache_key)
+        if cached_response is not None:
+            logger.info("Cache hit for response: %s...", cached_response[:100])
+            return cached_response, cache_key, None
+        
+        # Fall back to a semantically similar cached response; the match is on
+        # the user input alone, so turns that depend on earlier context are skipped
+        query_vector = None
+        if self.semantic_cache.enabled and len(conversation_history or []) <= self.semantic_cache_max_history:
+            query_vector = self.semantic_cache.embed(user_input)
+            cached_response = self.semantic_cache.lookup(query_vector)
+            if cached_response is not None:
+                logger.info("Semantic cache hit for response: %s...", cached_response[:100])
+        
+        return cached_response, cache_key, query_vector
+    
+    def _store_cache(self, cache_key: str, query_vector: Any, ai_response: str):
+        """Store a generated response in the caches"""
+        # Only deterministic completions are safe to replay
+        if self.temperature == 0:
+            self.cache.set(cache_key, ai_response)
+        if query_vector is not None:
+            self.semantic_cache.add(query_vector, ai_response)
+    
+    def _acquire_capacity(self, messages: List[Dict[str, str]], max_tokens: int):
+        """
+        Wait for request and token budget before calling OpenAI
+        
+        Args:
+            messages (List[Dict]): Messages that will be sent
+            max_tokens (int): Maximum tokens the completion may generate
+            
+        Raises:
+            RateLimitExceeded: If budget is not available within rate_limit_wait seconds
+        """
+        # Rough estimate of ~4 characters per prompt token
+        estimated_tokens = sum(len(message['content']) for message in messages) // 4 + max_tokens
+        
+        # Take both budgets together so a refused call doesn't spend either
+        budgets = [(self.request_limiter, 1), (self.token_limiter, estimated_tokens)]
+        if not acquire_all(budgets, timeout=self.rate_limit_wait):
+            raise RateLimitExceeded("Request or token budget exhausted")
+    
+    def _error_response(self, error: Exception) -> str:
+        """
+        Log an OpenAI error and pick a spoken fallback
+        
+        Args:
+            error (Exception): The error raised during generation
+            
+        Returns:
+            str: Fallback response for the caller
+        """
+        if isinstance(error, (openai.error.RateLimitError, RateLimitExceeded)):
             logger.error("OpenAI rate limit exceeded")
             return "I'm receiving too many requests right now. Please try again in a moment."
-            
-        except openai.error.InvalidRequestError as e:
-            logger.error(f"Invalid request to OpenAI: {str(e)}")
+        
+        if isinstance(error, openai.error.InvalidRequestError):
+            logger.error("Invalid request to OpenAI: %s", error)
             return "I'm having trouble processing your request. Could you please rephrase that?"
-            
-        except openai.error.AuthenticationError:
+        
+        if isinstance(error, openai.error.AuthenticationError):
             logger.error("OpenAI authentication failed")
             return "I'm experiencing technical difficulties. Please try again later."
+        
+        logger.error("Unexpected error in LLM generation: %s", error)
+        return "I'm sorry, I'm having trouble understanding. Could you please repeat that?"
+    
+    def _embed(self, text: str) -> List[float]:
+        """
+        Get an embedding vector for a text
+        
+        Args:
+            text (str): Text to embed
             
-        except Exception as e:
-            logger.error(f"Unexpected error in LLM generation: {str(e)}")
-            return "I'm sorry, I'm having trouble understanding. Could you please repeat that?"
+        Returns:
+            List[float]: Embedding vector
+        """
+        response = openai.Embedding.create(model=self.embedding_model, input=text)
+        return response['data'][0]['embedding']
     
     def _build_messages(self, user_input: str, conversation_history: List[Dict[str, str]] = None) -> List[Dict[str, str]]:
         """
@@ -89,12 +294,11 @@ class LLMHandler:
         messages = []
         
         # System message with bot personality
-        system_message = self._create_system_message()
-        messages.append({"role": "system", "content": system_message})
+        messages.append({"role": "system", "content": self.system_message})
         
         # Add conversation history
         if conversation_history:
-            for message in conversation_history[-10:]:  # Keep last 10 messages for context
+            for message in self._trim_history(conversation_history):
                 role = "user" if message.get("role") == "user" else "assistant"
                 content = message.get("content", "")
                 if content:
@@ -105,6 +309,28 @@ class LLMHandler:
         
         return messages
     
+    def _trim_history(self, conversation_history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        Trim conversation history to the configured maximum
+        
+        Old messages are dropped in blocks of half the maximum rather than one
+        per turn, so the start of the prompt stays byte-identical across turns
+        and OpenAI's prompt caching can reuse the prefix.
+        
+        Args:
+            conversation_history (List[Dict]): Previous conversation
+            
+        Returns:
+            List[Dict]: History to send with the request
+        """
+        overflow = len(conversation_history) - self.max_history
+        if overflow <= 0:
+            return conversation_history
+        
+        step = max(self.max_history // 2, 1)
+        start = -(-overflow // step) * step  # Round up to a whole block
+        return conversation_history[start:]
+    
     def _create_system_message(self) -> str:
         """
         Create the system message with bot personality
@@ -143,12 +369,14 @@ Remember: You're speaking over the phone, so keep responses conversational and n
             Dict: Sentiment analysis results
         """
         try:
+            messages = [
+                {"role": "system", "content": "Analyze the sentiment of the following text. Return only: positive, negative, or neutral."},
+                {"role": "user", "content": text}
+            ]
+            self._acquire_capacity(messages, 10)
             response = openai.ChatCompletion.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "Analyze the sentiment of the following text. Return only: positive, negative, or neutral."},
-                    {"role": "user", "content": text}
-                ],
+                messages=messages,
                 max_tokens=10,
                 temperature=0.1
             )
@@ -160,7 +388,7 @@ Remember: You're speaking over the phone, so keep responses conversational and n
             }
             
         except Exception as e:
-            logger.error(f"Error in sentiment analysis: {str(e)}")
+            logger.error("Error in sentiment analysis: %s", e)
             return {"sentiment": "neutral", "confidence": 0.0}
     
     def extract_intent(self, text: str) -> Dict[str, Any]:
@@ -174,12 +402,14 @@ Remember: You're speaking over the phone, so keep responses conversational and n
             Dict: Intent analysis results
         """
         try:
+            messages = [
+                {"role": "system", "content": "Extract the main intent from the following text. Return only: greeting, question, complaint, request, goodbye, or other."},
+                {"role": "user", "content": text}
+            ]
+            self._acquire_capacity(messages, 20)
             response = openai.ChatCompletion.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "Extract the main intent from the following text. Return only: greeting, question, complaint, request, goodbye, or other."},
-                    {"role": "user", "content": text}
-                ],
+                messages=messages,
                 max_tokens=20,
                 temperature=0.1
             )
@@ -191,5 +421,44 @@ Remember: You're speaking over the phone, so keep responses conversational and n
             }
             
         except Exception as e:
-            logger.error(f"Error in intent extraction: {str(e)}")
-            return {"intent": "other", "confidence": 0.0} 
\ No newline at end of file
+            logger.error("Error in intent extraction: %s", e)
+            return {"intent": "other", "confidence": 0.0}
+    
+    def analyze(self, text: str) -> Dict[str, Any]:
+        """
+        Analyze sentiment and intent of user input in a single request
+        
+        Args:
+            text (str): Text to analyze
+            
+        Returns:
+            Dict: Sentiment and intent analysis results
+        """
+        try:
+            messages = [
+                {"role": "system", "content": (
+                    "Analyze the following text and respond with a JSON object with two keys: "
+                    "\"sentiment\" (one of: positive, negative, neutral) and "
+                    "\"intent\" (one of: greeting, question, complaint, request, goodbye, other)."
+                )},
+                {"role": "user", "content": text}
+            ]
+            self._acquire_capacity(messages, 30)
+            response = openai.ChatCompletion.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=30,
+                temperature=0.1,
+                response_format={"type": "json_object"}
+            )
+            
+            result = orjson.loads(response.choices[0].message.content)
+            return {
+                "sentiment": str(result.get("sentiment", "neutral")).strip().lower(),
+                "intent": str(result.get("intent", "other")).strip().lower(),
+                "confidence": 0.8  # Placeholder confidence
+            }
+            
+        except Exception as e:
+            logger.error("Error in sentiment and intent analysis: %s", e)
+            return {"sentiment": "neutral", "intent": "other", "confidence": 0.0}
@@ -0,0 +1,86 @@
+"""
+Rate Limiter - OpenAI Request Budgeting
+Token buckets that keep concurrent calls within the account's RPM/TPM limits
+"""
+
+import time
+import threading
+from typing import Optional, Sequence, Tuple
+
+class RateLimitExceeded(Exception):
+    """Raised when capacity is not available within the allowed wait"""
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at a per-minute rate"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """
+        Initialize the token bucket
+
+        Args:
+            rate_per_minute (float): Units added to the bucket per minute
+            capacity (float): Maximum burst size, defaults to one minute of budget
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._available = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1, timeout: Optional[float] = None) -> bool:
+        """
+        Take units from the bucket, waiting for them to refill if needed
+
+        Args:
+            amount (float): Units to take
+            timeout (float): Maximum seconds to wait, None to wait indefinitely
+
+        Returns:
+            bool: True if the units were taken, False if the wait would exceed the timeout
+        """
+        return acquire_all([(self, amount)], timeout=timeout)
+
+    def _refill(self, now: float):
+        """Add the units earned since the last update; caller holds the lock"""
+        self._available = min(self.capacity, self._available + (now - self._updated) * self.rate)
+        self._updated = now
+
+def acquire_all(requests: Sequence[Tuple[TokenBucket, float]], timeout: Optional[float] = None) -> bool:
+    """
+    Take units from several buckets at once, or from none of them
+
+    Args:
+        requests (Sequence[Tuple]): (bucket, units) pairs, always given in the same bucket order
+        timeout (float): Maximum seconds to wait, None to wait indefinitely
+
+    Returns:
+        bool: True if every bucket's units were taken, False if the wait would exceed the timeout
+    """
+    requests = [(bucket, min(amount, bucket.capacity)) for bucket, amount in requests]
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    while True:
+        locks = [bucket._lock for bucket, _ in requests]
+        for lock in locks:
+            lock.acquire()
+        try:
+            now = time.monotonic()
+            wait = 0.0
+            for bucket, amount in requests:
+                bucket._refill(now)
+                if bucket._available < amount:
+                    wait = max(wait, (amount - bucket._available) / bucket.rate)
+
+            if not wait:
+                for bucket, amount in requests:
+                    bucket._available -= amount
+                return True
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+        if deadline is not None and now + wait > deadline:
+            return False
+
+        # Sleeping yields to other requests under gevent workers
+        time.sleep(wait)
@@ -0,0 +1,131 @@
+"""
+Redis Conversation Store - Shared Conversation State
+Keeps conversations in Redis so every worker process sees the same calls
+"""
+
+import logging
+import msgpack
+import redis
+from collections.abc import MutableMapping
+from datetime import datetime
+from typing import Dict, Iterator
+
+from chatbot.conversation import Conversation, Message
+
+logger = logging.getLogger(__name__)
+
+def serialize_conversation(conversation: Conversation) -> Dict[str, bytes]:
+    """
+    Serialize a conversation into Redis hash fields
+
+    Args:
+        conversation (Conversation): Conversation to serialize
+
+    Returns:
+        Dict[str, bytes]: msgpack-encoded header and messages
+    """
+    header = {
+        'call_sid': conversation.call_sid,
+        'from_number': conversation.from_number,
+        'to_number': conversation.to_number,
+        'start_time': conversation.start_time.isoformat(),
+        'is_active': conversation.is_active,
+        'metadata': conversation.metadata,
+        'user_count': conversation.user_count,
+        'assistant_count': conversation.assistant_count
+    }
+    messages = [
+        [message.role, message.content, message.timestamp_iso, message.metadata]
+        for message in conversation.messages
+    ]
+
+    return {
+        'conversation': msgpack.packb(header),
+        'messages': msgpack.packb(messages)
+    }
+
+def deserialize_conversation(data: Dict[bytes, bytes]) -> Conversation:
+    """
+    Rebuild a conversation from Redis hash fields
+
+    Args:
+        data (Dict): Hash fields as returned by HGETALL
+
+    Returns:
+        Conversation: The conversation object
+    """
+    header = msgpack.unpackb(data[b'conversation'])
+    messages = [
+        Message(
+            role=role,
+            content=content,
+            timestamp=datetime.fromisoformat(timestamp),
+            metadata=metadata
+        )
+        for role, content, timestamp, metadata in msgpack.unpackb(data[b'messages'])
+    ]
+
+    return Conversation(
+        call_sid=header['call_sid'],
+        from_number=header['from_number'],
+        to_number=header['to_number'],
+        start_time=datetime.fromisoformat(header['start_time']),
+        messages=messages,
+        is_active=header['is_active'],
+        metadata=header['metadata'],
+        user_count=header['user_count'],
+        assistant_count=header['assistant_count']
+    )
+
+class RedisConversationStore(MutableMapping):
+    """Mapping of call SID to conversation, stored as Redis hashes with a TTL"""
+
+    def __init__(self, client: redis.Redis, ttl: int = 86400, prefix: str = "conv:"):
+        """
+        Initialize the Redis store
+
+        Args:
+            client (redis.Redis): Redis client
+            ttl (int): Seconds a conversation is kept after its last write
+            prefix (str): Key prefix for conversation hashes
+        """
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+        logger.info("Redis conversation store initialized with TTL %ss", ttl)
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisConversationStore":
+        """Create a store from a Redis URL"""
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def _key(self, call_sid: str) -> str:
+        return f"{self.prefix}{call_sid}"
+
+    def __getitem__(self, call_sid: str) -> Conversation:
+        data = self.client.hgetall(self._key(call_sid))
+        if not data:
+            raise KeyError(call_sid)
+        return deserialize_conversation(data)
+
+    def __setitem__(self, call_sid: str, conversation: Conversation):
+        # Write the hash and refresh its TTL in one round-trip
+        pipeline = self.client.pipeline()
+        pipeline.hset(self._key(call_sid), mapping=serialize_conversation(conversation))
+        pipeline.expire(self._key(call_sid), self.ttl)
+        pipeline.execute()
+
+    def __delitem__(self, call_sid: str):
+        if not self.client.delete(self._key(call_sid)):
+            raise KeyError(call_sid)
+
+    def __contains__(self, call_sid: object) -> bool:
+        return bool(self.client.exists(self._key(call_sid)))
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.client.scan_iter(match=f"{self.prefix}*"):
+            yield key.decode('utf-8')[len(self.prefix):]
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=f"{self.prefix}*"))
@@ -3,13 +3,79 @@ Voice Handler - Speech Processing
 Handles voice-related operations and speech processing
 """
 
+import bisect
 import logging
 import re
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from typing import Dict, Any, Optional, Pattern, Tuple
 from config.settings import VOICE_SETTINGS
+from utils.helpers import TranslateFilter, keyword_categories, keyword_regex
 
 logger = logging.getLogger(__name__)
 
+# Compiled once at import; these run on every utterance and every response
+WHITESPACE_RE = re.compile(r'\s+')
+# Filler words, removed while punctuation still separates them from their neighbours
+FILLER_RE = re.compile(r'\b(?:um|uh|ah|er|hmm)\b')
+
+# Deletes punctuation, like re.sub(r'[^\w\s]', '', text)
+PUNCTUATION_TABLE = TranslateFilter(lambda char: char.isalnum() or char == '_' or char.isspace())
+SENTENCE_PAUSE_RE = re.compile(r'([.!?])\s+')
+
+# Markdown markup, stripped in separate passes so nested markup
+# (***bold italic***, `a*b*c`) is fully removed
+MARKDOWN_PATTERNS = (
+    re.compile(r'\*\*(.*?)\*\*'),  # Bold
+    re.compile(r'\*(.*?)\*'),      # Italic
+    re.compile(r'`(.*?)`')         # Code
+)
+
+# Abbreviations, rewritten in one pass. Only one alternative matches at a
+# time and unmatched groups expand to '', so a plain template drops the dots
+# without a Python callback per match.
+ABBREVIATION_RE = re.compile(r'\b(?:(etc|vs)|(i)\.(e)|(e)\.(g))\.')
+ABBREVIATION_TEMPLATE = r'\1\2\3\4\5'
+
+# Common speech patterns for detection, as keyword lists
+SPEECH_PATTERNS = {
+    "greeting": ('hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening'),
+    "goodbye": ('goodbye', 'bye', 'see you', 'talk to you later', 'have a good day'),
+    "question": ('what', 'when', 'where', 'who', 'why', 'how', 'which', 'can you', 'could you', 'would you'),
+    "complaint": ('problem', 'issue', 'wrong', 'broken', 'not working', 'complaint'),
+    "request": ('help', 'assist', 'support', 'need', 'want', 'please'),
+    "confirmation": ('yes', 'yeah', 'sure', 'okay', 'ok', 'correct', 'right'),
+    "negation": ('no', 'nope', 'not', 'never', 'wrong', 'incorrect'),
+    "thanks": ('thank you', 'thanks', 'appreciate it', 'grateful'),
+    "apology": ('sorry', 'apologize', 'excuse me', 'pardon'),
+    "urgency": ('urgent', 'asap', 'immediately', 'right now', 'emergency', 'critical')
+}
+
+# Below this recognition confidence the caller falls back to a "please speak
+# more clearly" prompt (see get_fallback_response), so analysis is skipped
+LOW_CONFIDENCE_THRESHOLD = 0.3
+
+# Fallback prompts by confidence tier: FALLBACK_RESPONSES[i] applies below
+# FALLBACK_THRESHOLDS[i], the last one at or above every threshold
+FALLBACK_THRESHOLDS = (LOW_CONFIDENCE_THRESHOLD, 0.6)
+FALLBACK_RESPONSES = (
+    "I'm having trouble understanding. Could you please speak more clearly?",
+    "I didn't catch that completely. Could you please repeat?",
+    "I'm sorry, I didn't understand. Could you please rephrase that?"
+)
+
+# Single-word cues, tested against the utterance's tokens
+MODERATE_URGENCY_WORDS = frozenset({'soon', 'quickly', 'fast', 'hurry'})
+
+# Per-pattern regexes, compiled once and shared by every handler. Keywords
+# are lowercase and matched against cleaned (already lowercased) text.
+COMPILED_SPEECH_PATTERNS: Dict[str, Pattern] = {
+    name: re.compile(keyword_regex(keywords)) for name, keywords in SPEECH_PATTERNS.items()
+}
+
+# One combined pattern scanned once per utterance instead of once per category
+SPEECH_KEYWORD_CATEGORIES = keyword_categories(COMPILED_SPEECH_PATTERNS, SPEECH_PATTERNS)
+SPEECH_KEYWORD_RE = re.compile(keyword_regex(SPEECH_KEYWORD_CATEGORIES))
+
 class VoiceHandler:
     """Handles voice processing and speech-related operations"""
     
@@ -18,6 +84,12 @@ class VoiceHandler:
         self.voice_settings = VOICE_SETTINGS
         self.speech_patterns = self._load_speech_patterns()
         
+        # Callers repeat short phrases ("yes", "thank you"), so the text
+        # analysis is memoized per handler; confidence is applied afterwards
+        self._analyze_text = lru_cache(
+            maxsize=self.voice_settings.get('analysis_cache_size', 2048)
+        )(self._analyze_text_uncached)
+        
         logger.info("Voice Handler initialized")
     
     def process_speech_input(self, speech_text: str, confidence: float = 0.0) -> Dict[str, Any]:
@@ -31,36 +103,57 @@ class VoiceHandler:
         Returns:
             Dict: Processed speech data
         """
-        try:
-            # Clean the speech text
-            cleaned_text = self._clean_speech_text(speech_text)
-            
-            # Analyze speech characteristics
-            analysis = self._analyze_speech(cleaned_text, confidence)
-            
-            # Detect speech patterns
-            patterns = self._detect_speech_patterns(cleaned_text)
-            
-            return {
-                "original_text": speech_text,
-                "cleaned_text": cleaned_text,
-                "confidence": confidence,
-                "analysis": analysis,
-                "patterns": patterns,
-                "is_valid": len(cleaned_text.strip()) > 0
-            }
+        # Nothing to analyze: missing text, or the fallback response will be
+        # used anyway. A confidence of 0.0 means Twilio didn't report one.
+        if not speech_text or not isinstance(speech_text, str) or 0.0 < confidence < LOW_CONFIDENCE_THRESHOLD:
+            return self._invalid_speech_result(speech_text, confidence)
+        
+        cleaned_text, patterns, analysis_items = self._analyze_text(speech_text)
+        
+        # Fresh containers per call so callers can't mutate cached results
+        analysis = dict(analysis_items)
+        analysis["confidence"] = confidence
+        
+        return {
+            "original_text": speech_text,
+            "cleaned_text": cleaned_text,
+            "confidence": confidence,
+            "analysis": analysis,
+            "patterns": list(patterns),
+            "is_valid": bool(cleaned_text)
+        }
+    
+    def _invalid_speech_result(self, speech_text: Optional[str], confidence: float) -> Dict[str, Any]:
+        """Build the result for input that is not analyzed"""
+        return {
+            "original_text": speech_text,
+            "cleaned_text": "",
+            "confidence": confidence,
+            "analysis": {"confidence": confidence},
+            "patterns": [],
+            "is_valid": False
+        }
+    
+    def _analyze_text_uncached(self, speech_text: str) -> Tuple[str, tuple, tuple]:
+        """
+        Clean, pattern-match and analyze speech text
+        
+        Args:
+            speech_text (str): Raw speech text
             
-        except Exception as e:
-            logger.error(f"Error processing speech input: {str(e)}")
-            return {
-                "original_text": speech_text,
-                "cleaned_text": "",
-                "confidence": 0.0,
-                "analysis": {},
-                "patterns": [],
-                "is_valid": False,
-                "error": str(e)
-            }
+        Returns:
+            Tuple: Cleaned text, detected patterns and analysis items, all immutable
+        """
+        # Clean the speech text
+        cleaned_text = self._clean_speech_text(speech_text)
+        
+        # Detect speech patterns
+        patterns = self._detect_speech_patterns(cleaned_text)
+        
+        # Analyze speech characteristics from the detected patterns
+        analysis = self._analyze_speech(cleaned_text, 0.0, patterns)
+        
+        return cleaned_text, tuple(patterns), tuple(analysis.items())
     
     def _clean_speech_text(self, text: str) -> str:
         """
@@ -75,43 +168,38 @@ class VoiceHandler:
         if not text:
             return ""
         
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove common speech artifacts
-        text = re.sub(r'\b(um|uh|ah|er|hmm)\b', '', text)
+        # Drop speech artifacts before punctuation is deleted, so "yes,um"
+        # doesn't collapse into a single word
+        text = FILLER_RE.sub('', text.lower())
         
-        # Remove punctuation that might interfere
-        text = re.sub(r'[^\w\s]', '', text)
+        # Delete punctuation with a C-level string method
+        text = text.translate(PUNCTUATION_TABLE)
         
-        # Strip leading/trailing whitespace
-        text = text.strip()
-        
-        return text
+        # Collapse whitespace and strip leading/trailing whitespace
+        return WHITESPACE_RE.sub(' ', text).strip()
     
-    def _analyze_speech(self, text: str, confidence: float) -> Dict[str, Any]:
+    def _analyze_speech(self, text: str, confidence: float, patterns: list) -> Dict[str, Any]:
         """
         Analyze speech characteristics
         
         Args:
-            text (str): Cleaned speech text
+            text (str): Cleaned speech text, already lowercase
             confidence (float): Recognition confidence
+            patterns (list): Patterns detected in the text
             
         Returns:
             Dict: Speech analysis results
         """
         analysis = {
-            "word_count": len(text.split()),
+            # Cleaned text is stripped and single-spaced, so count separators
+            "word_count": text.count(' ') + 1 if text else 0,
             "character_count": len(text),
             "confidence": confidence,
             "language": self.voice_settings.get("language", "en-US"),
-            "is_question": self._is_question(text),
-            "has_greeting": self._has_greeting(text),
-            "has_goodbye": self._has_goodbye(text),
-            "urgency_level": self._detect_urgency(text)
+            "is_question": "question" in patterns,
+            "has_greeting": "greeting" in patterns,
+            "has_goodbye": "goodbye" in patterns,
+            "urgency_level": self._detect_urgency(text, patterns)
         }
         
         return analysis
@@ -121,64 +209,33 @@ class VoiceHandler:
         Detect common speech patterns
         
         Args:
-            text (str): Cleaned speech text
+            text (str): Cleaned speech text, already lowercase
             
         Returns:
             list: Detected patterns
         """
-        patterns = []
+        found = set()
         
-        for pattern_name, pattern_regex in self.speech_patterns.items():
-            if re.search(pattern_regex, text, re.IGNORECASE):
-                patterns.append(pattern_name)
+        for match in SPEECH_KEYWORD_RE.finditer(text):
+            found.update(SPEECH_KEYWORD_CATEGORIES[match.group(1)])
         
-        return patterns
+        # Report in pattern order, as the per-pattern scan did
+        return [pattern_name for pattern_name in self.speech_patterns if pattern_name in found]
     
-    def _load_speech_patterns(self) -> Dict[str, str]:
+    def _load_speech_patterns(self) -> Dict[str, Pattern]:
         """
         Load common speech patterns for detection
         
         Returns:
-            Dict: Pattern name to regex mapping
+            Dict: Pattern name to compiled regex mapping
         """
-        return {
-            "greeting": r'\b(hello|hi|hey|good morning|good afternoon|good evening)\b',
-            "goodbye": r'\b(goodbye|bye|see you|talk to you later|have a good day)\b',
-            "question": r'\b(what|when|where|who|why|how|can you|could you|would you)\b',
-            "complaint": r'\b(problem|issue|wrong|broken|not working|complaint)\b',
-            "request": r'\b(help|assist|support|need|want|please)\b',
-            "confirmation": r'\b(yes|yeah|sure|okay|ok|correct|right)\b',
-            "negation": r'\b(no|nope|not|never|wrong|incorrect)\b',
-            "thanks": r'\b(thank you|thanks|appreciate it|grateful)\b',
-            "apology": r'\b(sorry|apologize|excuse me|pardon)\b',
-            "urgency": r'\b(urgent|asap|immediately|right now|emergency)\b'
-        }
-    
-    def _is_question(self, text: str) -> bool:
-        """Check if text contains a question"""
-        question_words = ['what', 'when', 'where', 'who', 'why', 'how', 'which']
-        return any(word in text.lower() for word in question_words) or text.strip().endswith('?')
-    
-    def _has_greeting(self, text: str) -> bool:
-        """Check if text contains a greeting"""
-        greetings = ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening']
-        return any(greeting in text.lower() for greeting in greetings)
-    
-    def _has_goodbye(self, text: str) -> bool:
-        """Check if text contains a goodbye"""
-        goodbyes = ['goodbye', 'bye', 'see you', 'talk to you later', 'have a good day']
-        return any(goodbye in text.lower() for goodbye in goodbyes)
+        return COMPILED_SPEECH_PATTERNS
     
-    def _detect_urgency(self, text: str) -> str:
+    def _detect_urgency(self, text: str, patterns: list) -> str:
         """Detect urgency level in text"""
-        urgent_words = ['urgent', 'asap', 'immediately', 'right now', 'emergency', 'critical']
-        moderate_words = ['soon', 'quickly', 'fast', 'hurry']
-        
-        text_lower = text.lower()
-        
-        if any(word in text_lower for word in urgent_words):
+        if "urgency" in patterns:
             return "high"
-        elif any(word in text_lower for word in moderate_words):
+        elif not MODERATE_URGENCY_WORDS.isdisjoint(text.split()):
             return "moderate"
         else:
             return "low"
@@ -197,18 +254,17 @@ class VoiceHandler:
             return ""
         
         # Remove markdown and formatting
-        text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)  # Bold
-        text = re.sub(r'\*(.*?)\*', r'\1', text)      # Italic
-        text = re.sub(r'`(.*?)`', r'\1', text)        # Code
+        for pattern in MARKDOWN_PATTERNS:
+            text = pattern.sub(r'\1', text)
         
-        # Add pauses for better speech flow
-        text = re.sub(r'([.!?])\s+', r'\1 <break time="0.5s"/> ', text)
+        # Handle abbreviations before pauses so their dots don't get one
+        text = ABBREVIATION_RE.sub(ABBREVIATION_TEMPLATE, text)
         
-        # Handle abbreviations
-        text = re.sub(r'\b(etc\.|vs\.|i\.e\.|e\.g\.)\b', lambda m: m.group(1).replace('.', ''), text)
+        # Add pauses for better speech flow
+        text = SENTENCE_PAUSE_RE.sub(r'\1 <break time="0.5s"/> ', text)
         
         # Ensure proper spacing
-        text = re.sub(r'\s+', ' ', text)
+        text = WHITESPACE_RE.sub(' ', text)
         
         return text.strip()
     
@@ -248,9 +304,4 @@ class VoiceHandler:
         Returns:
             str: Fallback response
         """
-        if confidence < 0.3:
-            return "I'm having trouble understanding. Could you please speak more clearly?"
-        elif confidence < 0.6:
-            return "I didn't catch that completely. Could you please repeat?"
-        else:
-            return "I'm sorry, I didn't understand. Could you please rephrase that?" 
\ No newline at end of file
+        return FALLBACK_RESPONSES[bisect.bisect_right(FALLBACK_THRESHOLDS, confidence)] 
\ No newline at end of file
@@ -24,7 +24,8 @@ VOICE_SETTINGS = {
     "speech_rate": 1.0,
     "timeout": 10,
     "speech_timeout": "auto",
-    "confidence_threshold": 0.5
+    "confidence_threshold": 0.5,
+    "analysis_cache_size": 2048
 }
 
 # LLM Settings
@@ -35,14 +36,26 @@ LLM_SETTINGS = {
     "top_p": 1.0,
     "frequency_penalty": 0.0,
     "presence_penalty": 0.0,
-    "max_history": 10
+    "max_history": 50,  # Trimmed in blocks to keep the prompt prefix cacheable
+    "cache_ttl": 3600,  # 1 hour
+    "cache_max_size": 10000,
+    "embedding_model": "text-embedding-3-small",
+    "semantic_cache_threshold": 0.92,
+    "semantic_cache_max_size": 1000,
+    "semantic_cache_max_history": 0,  # Cache is keyed on the user input alone, so only opening turns are safe to reuse
+    "requests_per_minute": 3500,
+    "tokens_per_minute": 90000,
+    "worker_processes": int(os.getenv('WEB_CONCURRENCY', 1)),  # Rate budgets are split across gunicorn workers
+    "rate_limit_wait": 5.0  # Seconds to wait for budget before giving up
 }
 
 # Twilio Settings
 TWILIO_SETTINGS = {
     "webhook_timeout": 30,
     "max_call_duration": 3600,  # 1 hour
-    "retry_attempts": 3
+    "retry_attempts": 3,
+    "http_pool_size": 20,
+    "http_timeout": 10
 }
 
 # Application Settings
@@ -152,6 +165,24 @@ MONITORING_SETTINGS = {
     }
 }
 
+# Category lookup table for get_setting/update_setting, built once
+_SETTINGS_MAP = {
+    'bot_personality': BOT_PERSONALITY,
+    'voice_settings': VOICE_SETTINGS,
+    'llm_settings': LLM_SETTINGS,
+    'twilio_settings': TWILIO_SETTINGS,
+    'app_settings': APP_SETTINGS,
+    'logging_settings': LOGGING_SETTINGS,
+    'security_settings': SECURITY_SETTINGS,
+    'error_messages': ERROR_MESSAGES,
+    'conversation_templates': CONVERSATION_TEMPLATES,
+    'feature_flags': FEATURE_FLAGS,
+    'api_endpoints': API_ENDPOINTS,
+    'database_settings': DATABASE_SETTINGS,
+    'monitoring_settings': MONITORING_SETTINGS
+}
+_EMPTY_SETTINGS: Dict[str, Any] = {}
+
 def get_setting(category: str, key: str, default: Any = None) -> Any:
     """
     Get a setting value with fallback to default
@@ -164,27 +195,7 @@ def get_setting(category: str, key: str, default: Any = None) -> Any:
     Returns:
         Any: Setting value
     """
-    settings_map = {
-        'bot_personality': BOT_PERSONALITY,
-        'voice_settings': VOICE_SETTINGS,
-        'llm_settings': LLM_SETTINGS,
-        'twilio_settings': TWILIO_SETTINGS,
-        'app_settings': APP_SETTINGS,
-        'logging_settings': LOGGING_SETTINGS,
-        'security_settings': SECURITY_SETTINGS,
-        'error_messages': ERROR_MESSAGES,
-        'conversation_templates': CONVERSATION_TEMPLATES,
-        'feature_flags': FEATURE_FLAGS,
-        'api_endpoints': API_ENDPOINTS,
-        'database_settings': DATABASE_SETTINGS,
-        'monitoring_settings': MONITORING_SETTINGS
-    }
-    
-    category_lower = category.lower()
-    if category_lower in settings_map:
-        return settings_map[category_lower].get(key, default)
-    
-    return default
+    return _SETTINGS_MAP.get(category.lower(), _EMPTY_SETTINGS).get(key, default)
 
 def update_setting(category: str, key: str, value: Any) -> bool:
     """
@@ -198,25 +209,9 @@ def update_setting(category: str, key: str, value: Any) -> bool:
     Returns:
         bool: True if updated successfully
     """
-    settings_map = {
-        'bot_personality': BOT_PERSONALITY,
-        'voice_settings': VOICE_SETTINGS,
-        'llm_settings': LLM_SETTINGS,
-        'twilio_settings': TWILIO_SETTINGS,
-        'app_settings': APP_SETTINGS,
-        'logging_settings': LOGGING_SETTINGS,
-        'security_settings': SECURITY_SETTINGS,
-        'error_messages': ERROR_MESSAGES,
-        'conversation_templates': CONVERSATION_TEMPLATES,
-        'feature_flags': FEATURE_FLAGS,
-        'api_endpoints': API_ENDPOINTS,
-        'database_settings': DATABASE_SETTINGS,
-        'monitoring_settings': MONITORING_SETTINGS
-    }
-    
-    category_lower = category.lower()
-    if category_lower in settings_map:
-        settings_map[category_lower][key] = value
-        return True
+    settings = _SETTINGS_MAP.get(category.lower())
+    if settings is None:
+        return False
     
-    return False 
\ No newline at end of file
+    settings[key] = value
+    return True 
\ No newline at end of file
@@ -6,21 +6,29 @@ import pytest
 import os
 import sys
 from unittest.mock import Mock, patch, MagicMock
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from chatbot.llm_handler import LLMHandler
+from chatbot.llm_handler import LLMHandler, StreamInterrupted
 from chatbot.voice_handler import VoiceHandler
 from chatbot.conversation import ConversationManager, Conversation, Message
+from chatbot.llm_cache import SemanticCache
+from chatbot.rate_limiter import TokenBucket, acquire_all
+from chatbot.redis_store import serialize_conversation, deserialize_conversation
 from utils.helpers import (
     sanitize_phone_number, 
     parse_intent_from_text, 
     analyze_sentiment_simple,
     validate_phone_number,
-    mask_phone_number
+    mask_phone_number,
+    rate_limit_check,
+    WindowCounter,
+    create_error_response,
+    REQUEST_TIMESTAMP
 )
+from utils import twiml
 
 class TestLLMHandler:
     """Test LLM Handler functionality"""
@@ -71,6 +79,164 @@ class TestLLMHandler:
         call_args = mock_openai.call_args[1]['messages']
         assert len(call_args) > 2  # System message + history + current input
 
+    @patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'})
+    @patch('openai.ChatCompletion.create')
+    def test_generate_response_cache_hit(self, mock_openai):
+        """Test identical deterministic requests are served from cache"""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Hello! How can I help you?"
+        mock_openai.return_value = mock_response
+
+        handler = LLMHandler()
+        handler.temperature = 0
+
+        first = handler.generate_response("Hello", [])
+        second = handler.generate_response("Hello", [])
+
+        assert first == second == "Hello! How can I help you?"
+        mock_openai.assert_called_once()
+        assert handler.cache.hits == 1
+
+    @patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'})
+    @patch('openai.ChatCompletion.create')
+    def test_analyze_single_call(self, mock_openai):
+        """Test sentiment and intent come back from one JSON-mode call"""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = '{"sentiment": "Negative", "intent": "complaint"}'
+        mock_openai.return_value = mock_response
+
+        handler = LLMHandler()
+        result = handler.analyze("My order never arrived")
+
+        assert result["sentiment"] == "negative"
+        assert result["intent"] == "complaint"
+        mock_openai.assert_called_once()
+        assert mock_openai.call_args[1]['response_format'] == {"type": "json_object"}
+
+    @patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'})
+    @patch('openai.ChatCompletion.create')
+    def test_stream_response_yields_sentences(self, mock_openai):
+        """Test streamed tokens are regrouped into sentences"""
+        tokens = ["Hello", " there", "! How", " can I", " help?"]
+        chunks = []
+        for token in tokens:
+            chunk = Mock()
+            chunk.choices = [Mock(delta={'content': token})]
+            chunks.append(chunk)
+        mock_openai.return_value = iter(chunks)
+
+        handler = LLMHandler()
+        sentences = list(handler.stream_response("Hi", []))
+
+        assert sentences == ["Hello there!", "How can I help?"]
+        assert mock_openai.call_args[1]['stream'] == True
+
+    @patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'})
+    @patch('openai.ChatCompletion.create')
+    def test_stream_response_keeps_abbreviations(self, mock_openai):
+        """Test abbreviations and initials don't split a streamed sentence"""
+        tokens = ["Dr.", " Smith will", " call at 3 p.m.", " tomorrow, e.g.", " Monday.", " J. Doe", " is next."]
+        chunks = []
+        for token in tokens:
+            chunk = Mock()
+            chunk.choices = [Mock(delta={'content': token})]
+            chunks.append(chunk)
+        mock_openai.return_value = iter(chunks)
+
+        handler = LLMHandler()
+        sentences = list(handler.stream_response("Who will call?", []))
+
+        assert sentences == ["Dr. Smith will call at 3 p.m. tomorrow, e.g. Monday.", "J. Doe is next."]
+
+    @patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'})
+    @patch('openai.ChatCompletion.create')
+    def test_stream_response_interrupted(self, mock_openai):
+        """Test a mid-stream failure is raised instead of yielded as a sentence"""
+        def chunks():
+            chunk = Mock()
+            chunk.choices = [Mock(delta={'content': "Let me check. One"})]
+            yield chunk
+            raise ConnectionError("stream dropped")
+        mock_openai.return_value = chunks()
+
+        handler = LLMHandler()
+        sentences = []
+        with pytest.raises(StreamInterrupted) as excinfo:
+            for sentence in handler.stream_response("Where is my order?", []):
+                sentences.append(sentence)
+
+        assert sentences == ["Let me check."]
+        assert excinfo.value.fallback == "I'm sorry, I'm having trouble understanding. Could you please repeat that?"
+
+    @patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'})
+    def test_trim_history_keeps_stable_prefix(self):
+        """Test history trimming drops whole blocks so the prefix is reused"""
+        handler = LLMHandler()
+        handler.max_history = 4
+        history = [{'role': 'user', 'content': f'message {i}'} for i in range(5)]
+
+        trimmed = handler._trim_history(history)
+        next_trimmed = handler._trim_history(history + [{'role': 'assistant', 'content': 'reply'}])
+
+        assert len(trimmed) <= 4
+        assert next_trimmed[:len(trimmed)] == trimmed
+        assert handler._trim_history(history[:3]) == history[:3]
+
+    def test_semantic_cache_lookup(self):
+        """Test semantic cache returns responses for similar inputs only"""
+        vectors = {
+            "what's the capital of france": [1.0, 0.0, 0.1],
+            "capital of france": [0.98, 0.0, 0.12],
+            "book a table": [0.0, 1.0, 0.0]
+        }
+        cache = SemanticCache(lambda text: vectors[text], threshold=0.92, max_size=2)
+
+        cache.add(cache.embed("what's the capital of france"), "Paris.")
+
+        assert cache.lookup(cache.embed("capital of france")) == "Paris."
+        assert cache.lookup(cache.embed("book a table")) is None
+
+    @patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'})
+    @patch('openai.ChatCompletion.create')
+    def test_semantic_cache_skips_turns_with_history(self, mock_openai):
+        """Test follow-up questions are never answered from another caller's context"""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Shipping takes 3 days."
+        mock_openai.return_value = mock_response
+
+        handler = LLMHandler()
+        handler.semantic_cache = SemanticCache(lambda text: [1.0, 0.0], threshold=0.5)
+        handler.semantic_cache.add(handler.semantic_cache.embed("How long does it take?"), "Refunds take 5-7 business days.")
+        history = [
+            {'role': 'user', 'content': 'Where is my package?'},
+            {'role': 'assistant', 'content': 'It has shipped.'}
+        ]
+
+        response = handler.generate_response("How long does it take?", history)
+
+        assert response == "Shipping takes 3 days."
+        mock_openai.assert_called_once()
+
+    def test_token_bucket_limits_burst(self):
+        """Test token bucket refuses requests beyond its capacity"""
+        bucket = TokenBucket(rate_per_minute=60, capacity=2)
+
+        assert bucket.acquire(1, timeout=0) == True
+        assert bucket.acquire(1, timeout=0) == True
+        assert bucket.acquire(1, timeout=0) == False
+
+    def test_acquire_all_takes_nothing_when_refused(self):
+        """Test a refused multi-bucket acquire leaves every bucket untouched"""
+        requests = TokenBucket(rate_per_minute=60, capacity=5)
+        tokens = TokenBucket(rate_per_minute=60, capacity=10)
+
+        assert acquire_all([(requests, 1), (tokens, 8)], timeout=0) == True
+        assert acquire_all([(requests, 1), (tokens, 8)], timeout=0) == False
+        assert requests.acquire(4, timeout=0) == True
+
 class TestVoiceHandler:
     """Test Voice Handler functionality"""
     
@@ -90,6 +256,20 @@ class TestVoiceHandler:
         assert result['confidence'] == 0.8
         assert result['is_valid'] == True
     
+    def test_process_speech_input_low_confidence(self):
+        """Test low-confidence input skips analysis"""
+        handler = VoiceHandler()
+        result = handler.process_speech_input("Hello there", 0.2)
+        
+        assert result['is_valid'] == False
+        assert result['patterns'] == []
+        assert handler._analyze_text.cache_info().misses == 0
+        
+        # Missing text is rejected up front rather than raising
+        result = handler.process_speech_input(None, 0.9)
+        assert result['is_valid'] == False
+        assert result['cleaned_text'] == ""
+    
     def test_clean_speech_text(self):
         """Test speech text cleaning"""
         handler = VoiceHandler()
@@ -102,6 +282,14 @@ class TestVoiceHandler:
         cleaned = handler._clean_speech_text("Um hello uh there")
         assert cleaned == "hello there"
         
+        # Test punctuation between words leaves a single space
+        cleaned = handler._clean_speech_text("Hmm... yes - please!")
+        assert cleaned == "yes please"
+        
+        # Test fillers joined to a word by punctuation are still removed
+        assert handler._clean_speech_text("Yes,um") == "yes"
+        assert handler._clean_speech_text("well,uh there") == "well there"
+        
         # Test empty input
         cleaned = handler._clean_speech_text("")
         assert cleaned == ""
@@ -122,6 +310,61 @@ class TestVoiceHandler:
         patterns = handler._detect_speech_patterns("I have a problem")
         assert "complaint" in patterns
     
+    def test_detect_overlapping_speech_patterns(self):
+        """Test keywords shared or nested across patterns report every pattern"""
+        handler = VoiceHandler()
+        
+        patterns = handler._detect_speech_patterns("it is not working right now")
+        assert patterns == ["complaint", "confirmation", "negation", "urgency"]
+        
+        patterns = handler._detect_speech_patterns("that is wrong")
+        assert patterns == ["complaint", "negation"]
+    
+    def test_analysis_uses_detected_patterns(self):
+        """Test speech analysis flags come from whole-word pattern matches"""
+        handler = VoiceHandler()
+        
+        analysis = handler.process_speech_input("This is critical, how soon?")["analysis"]
+        assert analysis["is_question"] == True
+        assert analysis["has_greeting"] == False  # 'hi' inside 'this' is not a greeting
+        assert analysis["urgency_level"] == "high"
+        
+        analysis = handler.process_speech_input("Please hurry")["analysis"]
+        assert analysis["urgency_level"] == "moderate"
+        
+        analysis = handler.process_speech_input("Which plan is cheaper")["analysis"]
+        assert analysis["is_question"] == True
+        
+        analysis = handler.process_speech_input("I missed breakfast")["analysis"]
+        assert analysis["urgency_level"] == "low"
+    
+    def test_process_speech_input_cached(self):
+        """Test repeated utterances reuse the cached analysis"""
+        handler = VoiceHandler()
+        
+        first = handler.process_speech_input("Thank you", 0.9)
+        first["patterns"].append("mutated")
+        second = handler.process_speech_input("Thank you", 0.4)
+        
+        assert handler._analyze_text.cache_info().hits == 1
+        assert second["patterns"] == ["thanks"]
+        assert second["analysis"]["confidence"] == 0.4
+    
+    def test_format_response_for_speech(self):
+        """Test markup is stripped and abbreviations don't trigger pauses"""
+        handler = VoiceHandler()
+        
+        formatted = handler.format_response_for_speech("**Sure!** Try `pip`, *vim*, etc. and more.")
+        assert formatted == 'Sure! <break time="0.5s"/> Try pip, vim, etc and more.'
+    
+    def test_format_response_for_speech_nested_markup(self):
+        """Test nested markdown leaves no asterisks or backticks to be spoken"""
+        handler = VoiceHandler()
+        
+        assert handler.format_response_for_speech("***Important***") == "Important"
+        assert handler.format_response_for_speech("**Note: *do not* hang up**") == "Note: do not hang up"
+        assert handler.format_response_for_speech("`a*b*c`") == "abc"
+    
     def test_validate_speech_confidence(self):
         """Test speech confidence validation"""
         handler = VoiceHandler()
@@ -130,6 +373,15 @@ class TestVoiceHandler:
         assert handler.validate_speech_confidence(0.3) == False
         assert handler.validate_speech_confidence(0.6, threshold=0.7) == False
 
+    def test_get_fallback_response_tiers(self):
+        """Test fallback prompts switch at the confidence thresholds"""
+        handler = VoiceHandler()
+        
+        assert "speak more clearly" in handler.get_fallback_response(0.29)
+        assert "repeat" in handler.get_fallback_response(0.3)
+        assert "repeat" in handler.get_fallback_response(0.59)
+        assert "rephrase" in handler.get_fallback_response(0.6)
+
 class TestConversationManager:
     """Test Conversation Manager functionality"""
     
@@ -208,6 +460,54 @@ class TestConversationManager:
         assert conversation.is_active == False
         assert 'end_time' in conversation.metadata
     
+    def test_cleanup_old_conversations(self):
+        """Test cleanup removes old ended conversations and evicts over capacity"""
+        manager = ConversationManager(max_conversations=2, cleanup_interval=0)
+        
+        old = manager.get_conversation("old-call")
+        old.start_time = datetime.now() - timedelta(hours=25)
+        manager.end_conversation("old-call")
+        
+        manager.get_conversation("ended-call")
+        manager.end_conversation("ended-call")
+        for call_sid in ["active-1", "active-2"]:
+            manager.get_conversation(call_sid)
+        
+        manager._cleanup_old_conversations()
+        
+        assert list(manager.conversations) == ["active-1", "active-2"]
+    
+    def test_cleanup_runs_on_background_timer(self):
+        """Test cleanup is scheduled off the request path"""
+        manager = ConversationManager(cleanup_interval=3600)
+        
+        assert manager._cleanup_timer is not None
+        assert manager._cleanup_timer.is_alive()
+        
+        with patch.object(manager, '_cleanup_old_conversations') as mock_cleanup:
+            manager.get_conversation("test-call-sid")
+            mock_cleanup.assert_not_called()
+        
+        manager.stop_cleanup()
+        assert manager._cleanup_timer is None
+    
+    def test_redis_serialization_round_trip(self):
+        """Test conversations survive Redis serialization"""
+        manager = ConversationManager()
+        manager.add_message("test-call-sid", "user", "Hello")
+        manager.add_message("test-call-sid", "assistant", "Hi!")
+        conversation = manager.get_conversation("test-call-sid")
+        
+        fields = serialize_conversation(conversation)
+        restored = deserialize_conversation({key.encode(): value for key, value in fields.items()})
+        
+        assert restored.call_sid == conversation.call_sid
+        assert restored.start_time == conversation.start_time
+        assert restored.get_history() == conversation.get_history()
+        assert restored.user_count == 1
+        assert 0 <= restored.duration_seconds() < 60
+        assert restored.messages[1].timestamp == conversation.messages[1].timestamp
+    
     def test_get_conversation_stats(self):
         """Test getting conversation statistics"""
         manager = ConversationManager()
@@ -224,6 +524,30 @@ class TestConversationManager:
         assert stats['user_messages'] == 2
         assert stats['assistant_messages'] == 1
         assert stats['is_active'] == True
+    
+    def test_search_conversations(self):
+        """Test case-insensitive conversation search"""
+        manager = ConversationManager()
+        
+        manager.add_message("call-1", "user", "My ORDER is late")
+        manager.add_message("call-2", "user", "Hello there")
+        
+        results = manager.search_conversations("order")
+        
+        assert len(results) == 1
+        assert results[0]['call_sid'] == "call-1"
+        assert results[0]['matching_message'] == "My ORDER is late"
+    
+    def test_get_all_conversations_newest_first(self):
+        """Test conversations are listed newest first"""
+        manager = ConversationManager()
+        
+        for call_sid in ["call-1", "call-2", "call-3"]:
+            manager.get_conversation(call_sid)
+        
+        conversations = manager.get_all_conversations(limit=2)
+        
+        assert [c['call_sid'] for c in conversations] == ["call-3", "call-2"]
 
 class TestHelpers:
     """Test helper utility functions"""
@@ -262,6 +586,15 @@ class TestHelpers:
         # Test general text
         intent = parse_intent_from_text("Random text here")
         assert intent['primary_intent'] == 'general'
+        
+        # Test phrases that contain other intents' keywords
+        intent = parse_intent_from_text("It's not working, fix it right now")
+        assert intent['all_intents'] == ['complaint', 'confirmation', 'negation', 'urgency']
+        
+        # Case-insensitive matches that don't lower to a keyword are skipped
+        assert parse_intent_from_text("I am ſorry")['primary_intent'] == 'general'
+        assert parse_intent_from_text("yeſ please")['all_intents'] == ['request']
+        assert parse_intent_from_text("Hİ")['primary_intent'] == 'general'
     
     def test_analyze_sentiment_simple(self):
         """Test simple sentiment analysis"""
@@ -278,6 +611,11 @@ class TestHelpers:
         # Test neutral sentiment
         sentiment = analyze_sentiment_simple("This is just a regular message")
         assert sentiment['sentiment'] == 'neutral'
+        
+        # Test words inside other words don't count
+        sentiment = analyze_sentiment_simple("Goodbye, it was likely fine")
+        assert sentiment['sentiment'] == 'neutral'
+        assert sentiment['positive_score'] == 0
     
     def test_validate_phone_number(self):
         """Test phone number validation"""
@@ -292,6 +630,64 @@ class TestHelpers:
         assert mask_phone_number("+1-123-456-7890") == "***-***-7890"
         assert mask_phone_number("") == ""
 
+    def test_phone_helpers_cached(self):
+        """Test repeat phone lookups are served from cache"""
+        sanitize_phone_number.cache_clear()
+        
+        first = sanitize_phone_number("(555) 010-0199")
+        assert sanitize_phone_number("(555) 010-0199") == first
+        assert sanitize_phone_number.cache_info().hits == 1
+
+    def test_rate_limit_check(self):
+        """Test per-number call limits"""
+        rate_limits = {'calls_per_minute': 2, 'calls_per_hour': 100, 'calls_per_day': 1000}
+        call_history = {}
+        
+        results = [rate_limit_check("+15550100", rate_limits, call_history) for _ in range(4)]
+        
+        assert results == [True, True, True, False]
+        assert rate_limit_check("+15550199", rate_limits, call_history) == True
+    
+    def test_window_counter_expires_buckets(self):
+        """Test ring buckets drop out of the window as time passes"""
+        counter = WindowCounter(60, 1)
+        for second in range(120):
+            counter.add(second + 0.5)
+        
+        assert counter.count(119.9) == 60
+        assert counter.count(150.0) == 29
+        assert counter.count(200.0) == 0
+    
+    def test_request_timestamp_shared(self):
+        """Test helpers reuse the per-request timestamp when one is set"""
+        token = REQUEST_TIMESTAMP.set("2024-01-01T12:00:00")
+        try:
+            assert create_error_response('timeout')['timestamp'] == "2024-01-01T12:00:00"
+        finally:
+            REQUEST_TIMESTAMP.reset(token)
+        
+        assert create_error_response('timeout')['timestamp'] != "2024-01-01T12:00:00"
+    
+    def test_twiml_fragments_match_voice_response(self):
+        """Test pre-rendered TwiML matches what VoiceResponse would build"""
+        from twilio.twiml.voice_response import VoiceResponse
+        from config.settings import VOICE_SETTINGS
+        
+        expected = VoiceResponse()
+        expected.say("Fish & <chips>", voice=VOICE_SETTINGS['voice'])
+        gather = expected.gather(
+            input='speech',
+            timeout=10,
+            speech_timeout='auto',
+            language=VOICE_SETTINGS['language'],
+            action='/webhook',
+            method='POST'
+        )
+        gather.say("What else can I help you with?", voice=VOICE_SETTINGS['voice'])
+        
+        rendered = twiml.build_response([twiml.say("Fish & <chips>"), twiml.CONTINUE_GATHER])
+        assert rendered == str(expected)
+
 class TestIntegration:
     """Integration tests"""
     
@@ -7,10 +7,51 @@ import re
 import hashlib
 import time
 import json
-from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
+import orjson
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Callable, Dict, Any, Iterable, Optional, Pattern
+from datetime import datetime
 from urllib.parse import urlparse, parse_qs
 
+# Wall-clock time of the request being handled, set once per request so
+# helpers and log events share one timestamp instead of each reading the clock
+REQUEST_TIMESTAMP: ContextVar[Optional[str]] = ContextVar('request_timestamp', default=None)
+
+def request_timestamp() -> str:
+    """
+    Get the current request's ISO timestamp
+    
+    Returns:
+        str: Request timestamp, or the current time outside a request
+    """
+    return REQUEST_TIMESTAMP.get() or datetime.now().isoformat()
+
+class TranslateFilter(dict):
+    """str.translate table that keeps characters matching a predicate, filled in per code point on first use"""
+    
+    def __init__(self, keep: Callable[[str], bool]):
+        """
+        Initialize the table
+        
+        Args:
+            keep (Callable): Returns True for characters to keep
+        """
+        super().__init__()
+        self.keep = keep
+    
+    def __missing__(self, codepoint: int) -> Optional[int]:
+        mapped = codepoint if self.keep(chr(codepoint)) else None
+        self[codepoint] = mapped
+        return mapped
+
+# Deletes every non-digit, like re.sub(r'\D', '', text)
+DIGITS_TABLE = TranslateFilter(str.isdecimal)
+
+# Phone helpers are pure and see the same few numbers on every webhook of a call
+PHONE_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=PHONE_CACHE_SIZE)
 def sanitize_phone_number(phone_number: str) -> str:
     """
     Sanitize and format phone number
@@ -25,7 +66,7 @@ def sanitize_phone_number(phone_number: str) -> str:
         return ""
     
     # Remove all non-digit characters
-    digits = re.sub(r'\D', '', phone_number)
+    digits = phone_number.translate(DIGITS_TABLE)
     
     # Handle different formats
     if len(digits) == 10:
@@ -78,7 +119,7 @@ def extract_call_metadata(request_data: Dict[str, Any]) -> Dict[str, Any]:
         'call_status': request_data.get('CallStatus', ''),
         'speech_result': request_data.get('SpeechResult', ''),
         'confidence': float(request_data.get('Confidence', 0)),
-        'timestamp': datetime.now().isoformat()
+        'timestamp': request_timestamp()
     }
     
     return metadata
@@ -134,7 +175,58 @@ def generate_conversation_id(call_sid: str, timestamp: datetime = None) -> str:
     
     # Create a hash from call_sid and timestamp
     hash_input = f"{call_sid}_{timestamp.isoformat()}"
-    return hashlib.md5(hash_input.encode()).hexdigest()[:12]
+    # Non-cryptographic identifier: a 6-byte BLAKE2 digest is the 12 hex chars directly
+    return hashlib.blake2b(hash_input.encode(), digest_size=6).hexdigest()
+
+def keyword_regex(keywords: Iterable[str]) -> str:
+    """
+    Build a whole-word alternation over literal keywords
+    
+    Args:
+        keywords (Iterable[str]): Keywords or phrases to match
+        
+    Returns:
+        str: Regex source, longest keywords first so phrases win over their prefixes
+    """
+    return r'\b(' + '|'.join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True)) + r')\b'
+
+def keyword_categories(patterns: Dict[str, Pattern], keyword_map: Dict[str, Iterable[str]]) -> Dict[str, tuple]:
+    """
+    Map each keyword to every category whose pattern it satisfies
+    
+    A combined scan reports one match per position, so a keyword also carries
+    the categories of any keyword it contains ('not working' is a complaint
+    and a negation) and of other categories listing the same word.
+    
+    Args:
+        patterns (Dict): Category name to compiled per-category pattern
+        keyword_map (Dict): Category name to its keywords
+        
+    Returns:
+        Dict: Keyword to tuple of category names, in category order
+    """
+    return {
+        keyword: tuple(name for name, pattern in patterns.items() if pattern.search(keyword))
+        for keywords in keyword_map.values()
+        for keyword in keywords
+    }
+
+# Intent keywords for parse_intent_from_text
+INTENT_KEYWORDS = {
+    'greeting': ('hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening'),
+    'goodbye': ('goodbye', 'bye', 'see you', 'talk to you later', 'have a good day'),
+    'question': ('what', 'when', 'where', 'who', 'why', 'how', 'can you', 'could you', 'would you'),
+    'complaint': ('problem', 'issue', 'wrong', 'broken', 'not working', 'complaint', 'angry', 'upset'),
+    'request': ('help', 'assist', 'support', 'need', 'want', 'please'),
+    'confirmation': ('yes', 'yeah', 'sure', 'okay', 'ok', 'correct', 'right'),
+    'negation': ('no', 'nope', 'not', 'never', 'wrong', 'incorrect'),
+    'thanks': ('thank you', 'thanks', 'appreciate it', 'grateful'),
+    'apology': ('sorry', 'apologize', 'excuse me', 'pardon'),
+    'urgency': ('urgent', 'asap', 'immediately', 'right now', 'emergency', 'critical')
+}
+INTENT_PATTERNS = {intent: re.compile(keyword_regex(keywords)) for intent, keywords in INTENT_KEYWORDS.items()}
+INTENT_KEYWORD_CATEGORIES = keyword_categories(INTENT_PATTERNS, INTENT_KEYWORDS)
+INTENT_KEYWORD_RE = re.compile(keyword_regex(INTENT_KEYWORD_CATEGORIES), re.IGNORECASE)
 
 def parse_intent_from_text(text: str) -> Dict[str, Any]:
     """
@@ -146,26 +238,15 @@ def parse_intent_from_text(text: str) -> Dict[str, Any]:
     Returns:
         Dict: Intent analysis
     """
-    text_lower = text.lower()
-    
-    # Define intent patterns
-    intent_patterns = {
-        'greeting': r'\b(hello|hi|hey|good morning|good afternoon|good evening)\b',
-        'goodbye': r'\b(goodbye|bye|see you|talk to you later|have a good day)\b',
-        'question': r'\b(what|when|where|who|why|how|can you|could you|would you)\b',
-        'complaint': r'\b(problem|issue|wrong|broken|not working|complaint|angry|upset)\b',
-        'request': r'\b(help|assist|support|need|want|please)\b',
-        'confirmation': r'\b(yes|yeah|sure|okay|ok|correct|right)\b',
-        'negation': r'\b(no|nope|not|never|wrong|incorrect)\b',
-        'thanks': r'\b(thank you|thanks|appreciate it|grateful)\b',
-        'apology': r'\b(sorry|apologize|excuse me|pardon)\b',
-        'urgency': r'\b(urgent|asap|immediately|right now|emergency|critical)\b'
-    }
+    # One case-insensitive scan over the text for every intent keyword;
+    # only the matched keywords are lowercased, not the whole text. Some
+    # Unicode matches ('ſ' for 's', 'İ' for 'i') don't lower to a keyword
+    # and are ignored.
+    found = set()
+    for match in INTENT_KEYWORD_RE.finditer(text):
+        found.update(INTENT_KEYWORD_CATEGORIES.get(match.group(1).lower(), ()))
     
-    detected_intents = []
-    for intent, pattern in intent_patterns.items():
-        if re.search(pattern, text_lower):
-            detected_intents.append(intent)
+    detected_intents = [intent for intent in INTENT_KEYWORDS if intent in found]
     
     # Determine primary intent
     primary_intent = detected_intents[0] if detected_intents else 'general'
@@ -176,6 +257,17 @@ def parse_intent_from_text(text: str) -> Dict[str, Any]:
         'confidence': 0.8 if detected_intents else 0.3
     }
 
+# Sentiment words for analyze_sentiment_simple
+POSITIVE_WORDS = frozenset({
+    'good', 'great', 'excellent', 'amazing', 'wonderful', 'fantastic',
+    'happy', 'pleased', 'satisfied', 'love', 'like', 'awesome', 'perfect'
+})
+NEGATIVE_WORDS = frozenset({
+    'bad', 'terrible', 'awful', 'horrible', 'disappointed', 'angry',
+    'upset', 'frustrated', 'hate', 'dislike', 'worst', 'broken', 'problem'
+})
+SENTIMENT_KEYWORD_RE = re.compile(keyword_regex(POSITIVE_WORDS | NEGATIVE_WORDS), re.IGNORECASE)
+
 def analyze_sentiment_simple(text: str) -> Dict[str, Any]:
     """
     Simple sentiment analysis
@@ -186,23 +278,13 @@ def analyze_sentiment_simple(text: str) -> Dict[str, Any]:
     Returns:
         Dict: Sentiment analysis
     """
-    text_lower = text.lower()
-    
-    # Positive words
-    positive_words = [
-        'good', 'great', 'excellent', 'amazing', 'wonderful', 'fantastic',
-        'happy', 'pleased', 'satisfied', 'love', 'like', 'awesome', 'perfect'
-    ]
-    
-    # Negative words
-    negative_words = [
-        'bad', 'terrible', 'awful', 'horrible', 'disappointed', 'angry',
-        'upset', 'frustrated', 'hate', 'dislike', 'worst', 'broken', 'problem'
-    ]
+    # Distinct sentiment words present, found as whole words in one
+    # case-insensitive scan
+    found = {word.lower() for word in SENTIMENT_KEYWORD_RE.findall(text)}
     
     # Count positive and negative words
-    positive_count = sum(1 for word in positive_words if word in text_lower)
-    negative_count = sum(1 for word in negative_words if word in text_lower)
+    positive_count = len(found & POSITIVE_WORDS)
+    negative_count = len(found & NEGATIVE_WORDS)
     
     # Determine sentiment
     if positive_count > negative_count:
@@ -222,44 +304,91 @@ def analyze_sentiment_simple(text: str) -> Dict[str, Any]:
         'negative_score': negative_count
     }
 
-def rate_limit_check(call_sid: str, rate_limits: Dict[str, int], call_history: Dict[str, List[datetime]]) -> bool:
+class WindowCounter:
+    """Sliding-window event count kept in a ring of fixed-width time buckets"""
+    
+    __slots__ = ('width', 'counts', 'head', 'total')
+    
+    def __init__(self, buckets: int, width: float):
+        """
+        Initialize the counter
+        
+        Args:
+            buckets (int): Number of buckets in the window
+            width (float): Seconds covered by each bucket
+        """
+        self.width = width
+        self.counts = [0] * buckets
+        self.head = 0   # Absolute number of the newest bucket in the ring
+        self.total = 0  # Running sum of counts, so reads never re-sum the ring
+    
+    def _advance(self, now: float) -> int:
+        """Slide the window to now, clearing buckets that fell out, and return the current slot"""
+        bucket = int(now // self.width)
+        size = len(self.counts)
+        if bucket - self.head >= size:
+            # Whole window expired
+            self.counts = [0] * size
+            self.total = 0
+        else:
+            for expired in range(self.head + 1, bucket + 1):
+                slot = expired % size
+                self.total -= self.counts[slot]
+                self.counts[slot] = 0
+        self.head = max(self.head, bucket)
+        return bucket % size
+    
+    def count(self, now: float) -> int:
+        """Events in the window ending at now, to bucket precision"""
+        self._advance(now)
+        return self.total
+    
+    def add(self, now: float):
+        """Record one event at now"""
+        self.counts[self._advance(now)] += 1
+        self.total += 1
+
+class CallWindows:
+    """Per-number call counts over the last minute, hour and day"""
+    
+    __slots__ = ('minute', 'hour', 'day')
+    
+    def __init__(self):
+        self.minute = WindowCounter(60, 1)     # 60 one-second buckets
+        self.hour = WindowCounter(60, 60)      # 60 one-minute buckets
+        self.day = WindowCounter(24, 3600)     # 24 one-hour buckets
+    
+    def add(self, now: float):
+        """Record a call at now"""
+        self.minute.add(now)
+        self.hour.add(now)
+        self.day.add(now)
+
+def rate_limit_check(call_sid: str, rate_limits: Dict[str, int], call_history: Dict[str, CallWindows]) -> bool:
     """
     Check if a call should be rate limited
     
     Args:
         call_sid (str): Call SID
         rate_limits (Dict): Rate limit configuration
-        call_history (Dict): Call history by phone number
+        call_history (Dict): Call counters by phone number, managed by this function
         
     Returns:
         bool: True if call should be allowed
     """
-    current_time = datetime.now()
+    current_time = time.monotonic()
     
     # Get phone number from call_sid (simplified)
     phone_number = call_sid.split('_')[0] if '_' in call_sid else call_sid
     
-    if phone_number not in call_history:
-        call_history[phone_number] = []
-    
-    # Remove old calls outside the time windows
-    call_history[phone_number] = [
-        call_time for call_time in call_history[phone_number]
-        if current_time - call_time < timedelta(days=1)
-    ]
-    
-    # Check rate limits
-    calls_per_minute = len([
-        call_time for call_time in call_history[phone_number]
-        if current_time - call_time < timedelta(minutes=1)
-    ])
-    
-    calls_per_hour = len([
-        call_time for call_time in call_history[phone_number]
-        if current_time - call_time < timedelta(hours=1)
-    ])
+    # Fixed-size bucket rings instead of one timestamp per call
+    windows = call_history.get(phone_number)
+    if not isinstance(windows, CallWindows):
+        windows = call_history[phone_number] = CallWindows()
     
-    calls_per_day = len(call_history[phone_number])
+    calls_per_minute = windows.minute.count(current_time)
+    calls_per_hour = windows.hour.count(current_time)
+    calls_per_day = windows.day.count(current_time)
     
     # Check if any limits are exceeded
     if (calls_per_minute > rate_limits.get('calls_per_minute', 10) or
@@ -268,9 +397,25 @@ def rate_limit_check(call_sid: str, rate_limits: Dict[str, int], call_history: D
         return False
     
     # Add current call to history
-    call_history[phone_number].append(current_time)
+    windows.add(current_time)
     return True
 
+# API error texts; private so they don't shadow config.settings.ERROR_MESSAGES,
+# which holds the spoken versions
+_ERROR_MESSAGES = {
+    'rate_limit': 'Too many requests. Please try again later.',
+    'invalid_request': 'Invalid request format.',
+    'authentication': 'Authentication failed.',
+    'timeout': 'Request timed out.',
+    'general': 'An error occurred. Please try again.'
+}
+
+# Response skeletons for the known error types, built once at import
+_ERROR_TEMPLATES = {
+    error_type: {'error': True, 'error_type': error_type, 'message': message}
+    for error_type, message in _ERROR_MESSAGES.items()
+}
+
 def create_error_response(error_type: str, message: str = None) -> Dict[str, Any]:
     """
     Create a standardized error response
@@ -282,21 +427,17 @@ def create_error_response(error_type: str, message: str = None) -> Dict[str, Any
     Returns:
         Dict: Error response
     """
-    error_messages = {
-        'rate_limit': 'Too many requests. Please try again later.',
-        'invalid_request': 'Invalid request format.',
-        'authentication': 'Authentication failed.',
-        'timeout': 'Request timed out.',
-        'general': 'An error occurred. Please try again.'
-    }
+    template = _ERROR_TEMPLATES.get(error_type)
+    if template is None:
+        template = {'error': True, 'error_type': error_type, 'message': 'Unknown error'}
     
     return {
-        'error': True,
-        'error_type': error_type,
-        'message': message or error_messages.get(error_type, 'Unknown error'),
-        'timestamp': datetime.now().isoformat()
+        **template,
+        'message': message or template['message'],
+        'timestamp': request_timestamp()
     }
 
+@lru_cache(maxsize=PHONE_CACHE_SIZE)
 def validate_phone_number(phone_number: str) -> bool:
     """
     Validate phone number format
@@ -311,11 +452,12 @@ def validate_phone_number(phone_number: str) -> bool:
         return False
     
     # Remove all non-digit characters
-    digits = re.sub(r'\D', '', phone_number)
+    digits = phone_number.translate(DIGITS_TABLE)
     
     # Check if it's a valid length
     return 10 <= len(digits) <= 15
 
+@lru_cache(maxsize=PHONE_CACHE_SIZE)
 def mask_phone_number(phone_number: str) -> str:
     """
     Mask phone number for privacy
@@ -330,7 +472,7 @@ def mask_phone_number(phone_number: str) -> str:
         return ""
     
     # Keep only last 4 digits visible
-    digits = re.sub(r'\D', '', phone_number)
+    digits = phone_number.translate(DIGITS_TABLE)
     if len(digits) >= 4:
         return f"***-***-{digits[-4:]}"
     
@@ -344,6 +486,8 @@ def json_serializer(obj):
         return obj.isoformat()
     raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
 
+SAFE_JSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
 def safe_json_dumps(data: Any) -> str:
     """
     Safely serialize data to JSON
@@ -354,6 +498,13 @@ def safe_json_dumps(data: Any) -> str:
     Returns:
         str: JSON string
     """
+    try:
+        # orjson serializes datetimes natively, matching json_serializer's isoformat()
+        return orjson.dumps(data, option=SAFE_JSON_OPTIONS).decode('utf-8')
+    except orjson.JSONEncodeError:
+        pass
+    
+    # Fall back for values orjson rejects, e.g. integers beyond 64 bits
     try:
         return json.dumps(data, default=json_serializer, indent=2)
     except Exception:
@@ -0,0 +1,43 @@
+"""
+JSON Provider
+orjson-backed JSON serialization for Flask responses
+"""
+
+import orjson
+from typing import Any
+from flask.json.provider import JSONProvider
+
+# Accept non-string dict keys, as Flask's default provider does
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider using orjson, which serializes datetimes natively"""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """
+        Serialize data to a JSON string
+
+        Args:
+            obj (Any): Data to serialize
+
+        Returns:
+            str: JSON string
+        """
+        return orjson.dumps(obj, option=ORJSON_OPTIONS).decode('utf-8')
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        """
+        Deserialize a JSON string or bytes
+
+        Args:
+            s (Any): JSON data
+
+        Returns:
+            Any: Deserialized data
+        """
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        """Build a JSON response from the encoded bytes without a str round-trip"""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, option=ORJSON_OPTIONS), mimetype='application/json')
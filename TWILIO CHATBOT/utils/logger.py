@@ -4,10 +4,25 @@ Centralized logging configuration and utilities
 """
 
 import os
+import atexit
+import queue
 import logging
 import logging.handlers
-from datetime import datetime
+import threading
+from typing import Optional, Set
 from config.settings import LOGGING_SETTINGS
+from utils.helpers import request_timestamp
+
+# Formatter shared by every configured logger
+FORMATTER = logging.Formatter(LOGGING_SETTINGS.get('format'))
+
+# Names of loggers setup_logger has configured; each is set up only once
+_configured: Set[str] = set()
+_configure_lock = threading.Lock()
+
+# Queue drained by the one listener that owns the console and file handlers,
+# shared by every configured logger so the log file has a single writer
+_log_queue: Optional[queue.SimpleQueue] = None
 
 def setup_logger(name: str = "callbot", level: str = None) -> logging.Logger:
     """
@@ -20,29 +35,50 @@ def setup_logger(name: str = "callbot", level: str = None) -> logging.Logger:
     Returns:
         logging.Logger: Configured logger
     """
-    # Create logs directory if it doesn't exist
-    log_dir = os.path.dirname(LOGGING_SETTINGS['file'])
-    if log_dir and not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-    
     # Get logger
     logger = logging.getLogger(name)
     
+    # Already configured (e.g. module re-imported by another worker entry point)
+    if name in _configured:
+        return logger
+    
+    with _configure_lock:
+        if name in _configured:
+            return logger
+        _configure_logger(logger, level)
+        _configured.add(name)
+    
+    return logger
+
+def _configure_logger(logger: logging.Logger, level: str = None):
+    """Attach a logger to the shared log queue; caller holds _configure_lock"""
     # Set level
     log_level = level or LOGGING_SETTINGS.get('level', 'INFO')
     logger.setLevel(getattr(logging, log_level.upper()))
     
-    # Clear existing handlers
-    logger.handlers.clear()
+    logger.addHandler(logging.handlers.QueueHandler(_shared_queue()))
     
-    # Create formatter
-    formatter = logging.Formatter(LOGGING_SETTINGS.get('format'))
+    # Prevent propagation to root logger
+    logger.propagate = False
+
+def _shared_queue() -> queue.SimpleQueue:
+    """Build the handlers and start the queue listener on first use; caller holds _configure_lock"""
+    global _log_queue
+    if _log_queue is not None:
+        return _log_queue
+    
+    # Create logs directory if it doesn't exist
+    log_dir = os.path.dirname(LOGGING_SETTINGS['file'])
+    if log_dir and not os.path.exists(log_dir):
+        os.makedirs(log_dir)
+    
+    handlers = []
     
     # Console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    console_handler.setFormatter(FORMATTER)
+    handlers.append(console_handler)
     
     # File handler with rotation
     if LOGGING_SETTINGS.get('file'):
@@ -52,13 +88,17 @@ def setup_logger(name: str = "callbot", level: str = None) -> logging.Logger:
             backupCount=LOGGING_SETTINGS.get('backup_count', 5)
         )
         file_handler.setLevel(logging.DEBUG)
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        file_handler.setFormatter(FORMATTER)
+        handlers.append(file_handler)
     
-    # Prevent propagation to root logger
-    logger.propagate = False
+    # Request threads only enqueue records; a background listener does the
+    # console and file I/O so logging never blocks a webhook response
+    _log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(_log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
     
-    return logger
+    return _log_queue
 
 def get_logger(name: str = None) -> logging.Logger:
     """
@@ -68,9 +108,12 @@ def get_logger(name: str = None) -> logging.Logger:
         name (str): Logger name
         
     Returns:
-        logging.Logger: Logger instance
+        logging.Logger: Logger instance, configured on first use
     """
-    return logging.getLogger(name or "callbot")
+    logger = logging.getLogger(name or "callbot")
+    if not logger.handlers:
+        setup_logger(logger.name)
+    return logger
 
 def log_call_event(logger: logging.Logger, event_type: str, call_sid: str, **kwargs):
     """
@@ -82,14 +125,17 @@ def log_call_event(logger: logging.Logger, event_type: str, call_sid: str, **kwa
         call_sid (str): Twilio call SID
         **kwargs: Additional event data
     """
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    
     event_data = {
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': request_timestamp(),
         'event_type': event_type,
         'call_sid': call_sid,
         **kwargs
     }
     
-    logger.info(f"Call Event: {event_type} - {call_sid}", extra=event_data)
+    logger.info("Call Event: %s - %s", event_type, call_sid, extra=event_data)
 
 def log_conversation_event(logger: logging.Logger, event_type: str, call_sid: str, **kwargs):
     """
@@ -101,14 +147,17 @@ def log_conversation_event(logger: logging.Logger, event_type: str, call_sid: st
         call_sid (str): Twilio call SID
         **kwargs: Additional event data
     """
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    
     event_data = {
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': request_timestamp(),
         'event_type': event_type,
         'call_sid': call_sid,
         **kwargs
     }
     
-    logger.info(f"Conversation Event: {event_type} - {call_sid}", extra=event_data)
+    logger.info("Conversation Event: %s - %s", event_type, call_sid, extra=event_data)
 
 def log_error(logger: logging.Logger, error: Exception, context: str = None, **kwargs):
     """
@@ -120,15 +169,18 @@ def log_error(logger: logging.Logger, error: Exception, context: str = None, **k
         context (str): Context where the error occurred
         **kwargs: Additional error data
     """
+    if not logger.isEnabledFor(logging.ERROR):
+        return
+    
     error_data = {
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': request_timestamp(),
         'error_type': type(error).__name__,
         'error_message': str(error),
         'context': context,
         **kwargs
     }
     
-    logger.error(f"Error in {context}: {str(error)}", extra=error_data, exc_info=True)
+    logger.error("Error in %s: %s", context, error, extra=error_data, exc_info=True)
 
 def log_performance(logger: logging.Logger, operation: str, duration: float, **kwargs):
     """
@@ -140,14 +192,17 @@ def log_performance(logger: logging.Logger, operation: str, duration: float, **k
         duration (float): Duration in seconds
         **kwargs: Additional performance data
     """
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    
     perf_data = {
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': request_timestamp(),
         'operation': operation,
         'duration_seconds': duration,
         **kwargs
     }
     
-    logger.info(f"Performance: {operation} took {duration:.3f}s", extra=perf_data)
+    logger.info("Performance: %s took %.3fs", operation, duration, extra=perf_data)
 
 def log_api_call(logger: logging.Logger, api_name: str, endpoint: str, status_code: int = None, **kwargs):
     """
@@ -160,16 +215,21 @@ def log_api_call(logger: logging.Logger, api_name: str, endpoint: str, status_co
         status_code (int): HTTP status code
         **kwargs: Additional API call data
     """
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    
     api_data = {
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': request_timestamp(),
         'api_name': api_name,
         'endpoint': endpoint,
         'status_code': status_code,
         **kwargs
     }
     
-    status_text = f" ({status_code})" if status_code else ""
-    logger.info(f"API Call: {api_name} - {endpoint}{status_text}", extra=api_data)
+    if status_code:
+        logger.info("API Call: %s - %s (%s)", api_name, endpoint, status_code, extra=api_data)
+    else:
+        logger.info("API Call: %s - %s", api_name, endpoint, extra=api_data)
 
 def create_structured_log(logger: logging.Logger, level: str, message: str, **kwargs):
     """
@@ -181,8 +241,12 @@ def create_structured_log(logger: logging.Logger, level: str, message: str, **kw
         message (str): Log message
         **kwargs: Structured data
     """
+    level_no = logging.getLevelName(level.upper())
+    if not logger.isEnabledFor(level_no if isinstance(level_no, int) else logging.INFO):
+        return
+    
     log_data = {
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': request_timestamp(),
         'message': message,
         **kwargs
     }
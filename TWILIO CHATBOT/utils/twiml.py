@@ -0,0 +1,72 @@
+"""
+TwiML Templates
+Pre-rendered TwiML fragments for the voice webhook
+"""
+
+from typing import Iterable
+from xml.sax.saxutils import escape
+from twilio.twiml.voice_response import Gather, Say, VoiceResponse
+from config.settings import VOICE_SETTINGS
+
+_TEXT_PLACEHOLDER = "{text}"
+
+def _render(verb) -> str:
+    """Serialize a TwiML verb without the XML declaration"""
+    return verb.to_xml(xml_declaration=False)
+
+def _gather(prompt: str = None) -> str:
+    """Render the speech <Gather> used to wait for the caller's next turn"""
+    gather = Gather(
+        input='speech',
+        timeout=VOICE_SETTINGS['timeout'],
+        speech_timeout=VOICE_SETTINGS['speech_timeout'],
+        language=VOICE_SETTINGS['language'],
+        action='/webhook',
+        method='POST'
+    )
+    if prompt:
+        gather.say(prompt, voice=VOICE_SETTINGS['voice'])
+    return _render(gather)
+
+# Document wrapper, split around an empty body
+RESPONSE_OPEN = str(VoiceResponse()).replace("<Response />", "<Response>")
+RESPONSE_CLOSE = "</Response>"
+
+# <Say> wrapper for dynamic text, split around a placeholder
+SAY_OPEN, SAY_CLOSE = _render(Say(_TEXT_PLACEHOLDER, voice=VOICE_SETTINGS['voice'])).split(_TEXT_PLACEHOLDER)
+
+# Invariant prompts, rendered once at import
+LISTENING_GATHER = _gather("I'm listening...")
+CONTINUE_GATHER = _gather("What else can I help you with?")
+REPEAT_GATHER = _gather()
+
+def say(text: str) -> str:
+    """
+    Render a <Say> element for dynamic text
+
+    Args:
+        text (str): Text to speak
+
+    Returns:
+        str: Serialized <Say> element
+    """
+    return f"{SAY_OPEN}{escape(text)}{SAY_CLOSE}"
+
+def build_response(fragments: Iterable[str]) -> str:
+    """
+    Wrap pre-rendered fragments in a <Response> document
+
+    Args:
+        fragments (Iterable[str]): Serialized TwiML verbs
+
+    Returns:
+        str: Complete TwiML document
+    """
+    return RESPONSE_OPEN + "".join(fragments) + RESPONSE_CLOSE
+
+# Fixed <Say> elements
+FAREWELL_SAY = say("Thank you for calling. Have a great day!")
+REPEAT_SAY = say("I didn't catch that. Could you please repeat?")
+ERROR_RESPONSE = build_response([
+    say("I'm sorry, I'm experiencing technical difficulties. Please try again later.")
+])